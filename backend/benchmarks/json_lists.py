@@ -0,0 +1,113 @@
+"""
+Benchmark: 1000-row list pages through the regular and the fast JSON path.
+
+    python benchmarks/json_lists.py [--rows 1200] [--limit 1000] [--runs 30]
+
+Seeds a scratch database in a temporary directory, requests the commission
+and portfolio listings with FAST_JSON_RESPONSES off and on, checks that both
+paths return the same JSON and prints the median/p95 latency of each.
+Needs the dev requirements (pip install -r requirements-dev.txt).
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def seed(engine, rows: int) -> None:
+    from models import CommissionRequest, PortfolioItem
+
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    statuses = ["pending", "accepted", "rejected"]
+    progress = ["not_started", "sketch", "lineart", "coloring", "completed"]
+    categories = ["Chibi", "Full Body", "Portrait", "Character Design"]
+    commissions, items = [], []
+    for i in range(rows):
+        created_at = start + timedelta(minutes=i)
+        commissions.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "full_name": f"Cliente {i}",
+            "discord_id": f"cliente#{i:04d}",
+            "email": f"cliente{i}@example.com",
+            "project_description": "Personagem em pose dinâmica, fundo simples. " * 4,
+            "status": rng.choice(statuses),
+            "payment_status": "pending",
+            "progress_status": rng.choice(progress),
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+        digest = f"{rng.getrandbits(256):064x}"
+        base = f"/uploads/blobs/{digest[:2]}/{digest[2:4]}/{digest}"
+        items.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "title": f"Arte {i}",
+            "description": "Ilustração digital",
+            "category": rng.choice(categories),
+            "image_url": f"{base}.png",
+            "image_variants": {
+                name: {"url": f"{base}-{name}.webp", "width": width, "height": width * 3 // 4}
+                for name, width in [("thumb", 320), ("medium", 800)]
+            },
+            "is_featured": i % 10 == 0,
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+    with engine.begin() as conn:
+        conn.execute(CommissionRequest.__table__.insert(), commissions)
+        conn.execute(PortfolioItem.__table__.insert(), items)
+
+def measure(client, path: str, runs: int):
+    timings, body = [], None
+    client.get(path)  # warm up
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.text
+        body = response.json()
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1], body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1200)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench-json-"))
+    sys.path.insert(0, BACKEND_DIR)
+    import database
+    from config import settings
+    from migrations import apply_migrations
+
+    apply_migrations(database.engine, log=lambda message: None)
+    seed(database.engine, args.rows)
+
+    import main as app_module
+    from fastapi.testclient import TestClient
+
+    print(f"{args.rows} linhas, páginas de {args.limit}, {args.runs} execuções\n")
+    print(f"{'endpoint':<28}{'caminho':<10}{'mediana':>10}{'p95':>10}")
+    with TestClient(app_module.app) as client:
+        for path in (f"/api/commissions/?limit={args.limit}", f"/api/portfolio/?limit={args.limit}"):
+            results = {}
+            for fast in (False, True):
+                settings.FAST_JSON_RESPONSES = fast
+                results[fast] = measure(client, path, args.runs)
+            assert results[False][2] == results[True][2], f"{path}: os dois caminhos divergem"
+            for fast, (median, p95, _) in results.items():
+                label = "rápido" if fast else "padrão"
+                print(f"{path.split('?')[0]:<28}{label:<10}{median:>8.1f}ms{p95:>8.1f}ms")
+            print(f"{'':<28}{'ganho':<10}{results[False][0] / results[True][0]:>9.1f}x\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Performance regression gate: the benchmark suite against a stored baseline.
+
+    python benchmarks/regression.py [--runs 3] [--latency-tolerance 0.25]
+                                    [--queries-tolerance 0] [--rss-tolerance 0.15]
+    python benchmarks/regression.py --update-baseline
+    python benchmarks/regression.py --results benchmarks/results/latest.json
+
+Runs benchmarks/suite.py with a fixed configuration (GATE_ARGUMENTS), each
+run in a fresh process, and compares every scenario with
+benchmarks/baseline.json:
+
+- median latency (p50) may grow by `--latency-tolerance` (relative) plus
+  `--latency-floor-ms`, so sub-millisecond routes are not failed by noise,
+- SQL statements per request may grow by `--queries-tolerance` (absolute),
+- peak RSS of the run may grow by `--rss-tolerance` (relative),
+- a scenario that had no errors must still have none.
+
+With `--runs N` each scenario keeps its best median of N runs, which filters
+out most of the scheduling noise. Prints a diff table and exits with status 1
+on any regression (2 when the baseline is missing or was taken with another
+configuration). Latencies only compare on the same machine: refresh the
+baseline with `--update-baseline` when changing hardware, or when a slowdown
+is accepted. Needs the dev requirements (pip install -r requirements-dev.txt).
+
+The committed baseline.json was recorded on a 1-CPU sandbox with
+FAST_JSON_RESPONSES off; its `revision` is the checkout it was measured on
+(the parent of the commit that stores it). Regenerate it on the machine that
+runs the gate before relying on the latency and RSS checks; the SQL counts
+and error checks hold anywhere.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import List, Optional
+
+from json_lists import BACKEND_DIR
+
+BENCHMARKS_DIR = os.path.join(BACKEND_DIR, "benchmarks")
+BASELINE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+
+# Sequential requests: the median is the cost of one request, not queueing
+GATE_ARGUMENTS = {"rows": 1000, "requests": 100, "upload_requests": 10, "concurrency": 1, "warmup": 10}
+
+def run_suite(output: str) -> dict:
+    command = [sys.executable, os.path.join(BENCHMARKS_DIR, "suite.py"), "--output", output]
+    for name, value in GATE_ARGUMENTS.items():
+        command += [f"--{name.replace('_', '-')}", str(value)]
+    subprocess.run(command, cwd=BACKEND_DIR, check=True, stdout=subprocess.DEVNULL)
+    with open(output) as results_file:
+        return json.load(results_file)
+
+def best_of(reports: List[dict]) -> dict:
+    """One report from several runs: the lowest median and RSS, the highest error count."""
+    best = json.loads(json.dumps(reports[0]))
+    for report in reports[1:]:
+        for name, scenario in report["scenarios"].items():
+            kept = best["scenarios"][name]
+            if scenario["p50_ms"] < kept["p50_ms"]:
+                errors = max(kept["errors"], scenario["errors"])
+                kept.update(scenario, errors=errors)
+            else:
+                kept["errors"] = max(kept["errors"], scenario["errors"])
+        best["meta"]["peak_rss_mb"] = min(best["meta"]["peak_rss_mb"], report["meta"]["peak_rss_mb"])
+    best["meta"]["runs"] = len(reports)
+    return best
+
+def configuration(report: dict) -> dict:
+    """What must match for two reports to be comparable."""
+    return {name: report["meta"].get(name) for name in (*GATE_ARGUMENTS, "only", "database_async", "fast_json_responses")}
+
+def _change(baseline: float, current: float) -> str:
+    if not baseline:
+        return "-"
+    return f"{(current - baseline) / baseline * 100:+.0f}%"
+
+def compare(baseline: dict, current: dict, args) -> List[List[str]]:
+    """Diff rows (scenario, metric, baseline, current, change, verdict); verdict "REGRESSÃO" fails the gate."""
+    rows = []
+    for name, base in baseline["scenarios"].items():
+        scenario = current["scenarios"].get(name)
+        if scenario is None:
+            rows.append([name, "cenário", "presente", "ausente", "-", "REGRESSÃO"])
+            continue
+        limit = base["p50_ms"] * (1 + args.latency_tolerance) + args.latency_floor_ms
+        verdict = "REGRESSÃO" if scenario["p50_ms"] > limit else (
+            "melhora" if scenario["p50_ms"] < base["p50_ms"] / (1 + args.latency_tolerance) else "ok"
+        )
+        rows.append([
+            name, "p50", f"{base['p50_ms']:.1f}ms", f"{scenario['p50_ms']:.1f}ms",
+            _change(base["p50_ms"], scenario["p50_ms"]), verdict,
+        ])
+        if base["queries_per_request"] is not None and scenario["queries_per_request"] is not None:
+            change = scenario["queries_per_request"] - base["queries_per_request"]
+            verdict = "REGRESSÃO" if change > args.queries_tolerance else ("melhora" if change < 0 else "ok")
+            rows.append([
+                name, "SQL/req", f"{base['queries_per_request']:.1f}", f"{scenario['queries_per_request']:.1f}",
+                f"{change:+.1f}", verdict,
+            ])
+        if scenario["errors"] and not base["errors"]:
+            rows.append([name, "erros", "0", str(scenario["errors"]), "-", "REGRESSÃO"])
+    for name in current["scenarios"].keys() - baseline["scenarios"].keys():
+        rows.append([name, "cenário", "ausente", "novo", "-", "sem baseline"])
+
+    base_rss, rss = baseline["meta"]["peak_rss_mb"], current["meta"]["peak_rss_mb"]
+    verdict = "REGRESSÃO" if rss > base_rss * (1 + args.rss_tolerance) else "ok"
+    rows.append(["(processo)", "pico RSS", f"{base_rss:.0f}MB", f"{rss:.0f}MB", _change(base_rss, rss), verdict])
+    return rows
+
+def print_report(rows: List[List[str]], only_changes: bool) -> None:
+    header = ["cenário", "métrica", "baseline", "atual", "variação", ""]
+    shown = [row for row in rows if not only_changes or row[-1] != "ok"]
+    widths = [max(len(row[i]) for row in [header] + shown) for i in range(len(header))]
+    for row in [header] + shown:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--results", help="compare this suite output instead of running the suite")
+    parser.add_argument("--runs", type=int, default=3, help="suite runs; each scenario keeps its best median")
+    parser.add_argument("--latency-tolerance", type=float, default=0.25, help="allowed relative p50 growth")
+    parser.add_argument("--latency-floor-ms", type=float, default=0.5, help="allowed absolute p50 growth on top")
+    parser.add_argument("--queries-tolerance", type=float, default=0.0, help="allowed extra SQL statements per request")
+    parser.add_argument("--rss-tolerance", type=float, default=0.15, help="allowed relative peak RSS growth")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--verbose", action="store_true", help="list unchanged metrics too")
+    args = parser.parse_args()
+
+    if args.results:
+        with open(args.results) as results_file:
+            current = json.load(results_file)
+    else:
+        reports = []
+        with tempfile.TemporaryDirectory(prefix="bench-gate-") as directory:
+            for run in range(args.runs):
+                print(f"Executando a suíte ({run + 1}/{args.runs})...", flush=True)
+                reports.append(run_suite(os.path.join(directory, f"run{run}.json")))
+        current = best_of(reports)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(current, baseline_file, indent=2)
+            baseline_file.write("\n")
+        print(f"Baseline gravada em {args.baseline}")
+        return 0
+
+    baseline: Optional[dict] = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    if baseline is None:
+        print(f"Sem baseline em {args.baseline}: rode com --update-baseline", file=sys.stderr)
+        return 2
+    if configuration(baseline) != configuration(current):
+        print(
+            f"Configuração diferente da baseline: {configuration(baseline)} != {configuration(current)}; "
+            "rode com --update-baseline",
+            file=sys.stderr,
+        )
+        return 2
+
+    rows = compare(baseline, current, args)
+    regressions = [row for row in rows if row[-1] == "REGRESSÃO"]
+    print()
+    print_report(rows, only_changes=not args.verbose)
+    print(
+        f"\nBaseline {baseline['meta'].get('revision') or '?'} ({baseline['meta']['timestamp']}), "
+        f"atual {current['meta'].get('revision') or '?'}"
+    )
+    if regressions:
+        print(f"❌ {len(regressions)} regressão(ões) de desempenho")
+        return 1
+    print("✅ Sem regressões de desempenho")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Benchmark suite: throughput and latency percentiles of the API routes.
+
+    python benchmarks/suite.py [--rows 1000] [--requests 300] [--upload-requests 40]
+                               [--concurrency 10] [--only portfolio_list,commission_create]
+                               [--output benchmarks/results/latest.json]
+
+Seeds a scratch database in a temporary directory (see json_lists.seed),
+then drives the ASGI app from main.py in process through an async httpx
+client, `--concurrency` requests at a time. Every scenario reports
+requests/s, p50/p95/p99 latency, SQL statements per request and the
+process RSS; the results are also written as JSON so runs can be compared.
+Needs the dev requirements (pip install -r requirements-dev.txt).
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, NamedTuple, Optional
+
+from json_lists import BACKEND_DIR, seed
+
+ADMIN_EMAIL = "bench@example.com"
+ADMIN_PASSWORD = "bench-password"
+
+class Scenario(NamedTuple):
+    name: str
+    group: str  # public, admin or upload
+    method: str
+    path: str
+    # Extra httpx request arguments (json, data, files...) for the i-th request
+    build: Optional[Callable[[int], dict]] = None
+    admin: bool = False
+    expect: int = 200
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+def rss_mb() -> float:
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+def png(index: int) -> bytes:
+    """A distinct 1200x900 PNG per index, so every upload is a new blob."""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (1200, 900), (index % 256, index // 256 % 256, 90)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def build_scenarios(commission_ids: List[str]) -> List[Scenario]:
+    def commission(i):
+        return {"json": {
+            "full_name": f"Cliente Benchmark {i}",
+            "discord_id": f"bench#{i:04d}",
+            "email": f"bench{i}@example.com",
+            "project_description": "Retrato meio corpo, fundo simples, cores quentes.",
+        }}
+
+    # Offset the image indexes per scenario so no two uploads share a blob
+    def portfolio_upload(i):
+        return {
+            "data": {"title": f"Upload {i}", "category": "Benchmark"},
+            "files": {"image": (f"upload{i}.png", png(i), "image/png")},
+        }
+
+    def batch_upload(i):
+        files = [("images", (f"batch{i}-{n}.png", png(10_000 + i * 4 + n), "image/png")) for n in range(4)]
+        metadata = [{"title": f"Lote {i}-{n}", "category": "Benchmark"} for n in range(4)]
+        return {"data": {"metadata": json.dumps(metadata)}, "files": files}
+
+    def background_upload(i):
+        return {"files": {"image": (f"background{i}.png", png(20_000 + i), "image/png")}}
+
+    def profile_upload(i):
+        return {"files": {"image": (f"profile{i}.png", png(30_000 + i), "image/png")}}
+
+    def commission_patch(i):
+        return {"json": {"notes": f"Atualizado pelo benchmark ({i})"}}
+
+    def bulk_patch(i):
+        start = i * 20 % max(1, len(commission_ids) - 20)
+        return {"json": {"ids": commission_ids[start:start + 20], "changes": {"payment_status": "50_paid"}}}
+
+    some_id = commission_ids[0]
+    return [
+        Scenario("portfolio_list", "public", "GET", "/api/portfolio/?limit=50"),
+        Scenario("portfolio_categories", "public", "GET", "/api/portfolio/categories/list"),
+        Scenario("portfolio_search", "public", "GET", "/api/portfolio/search?q=arte"),
+        Scenario("commissions_status", "public", "GET", "/api/settings/commissions/status"),
+        Scenario("commission_create", "public", "POST", "/api/commissions/", commission, expect=201),
+        Scenario("commission_list", "admin", "GET", "/api/commissions/?limit=50", admin=True),
+        Scenario("commission_detail", "admin", "GET", f"/api/commissions/{some_id}", admin=True),
+        Scenario("commission_update", "admin", "PUT", f"/api/commissions/{some_id}", commission_patch, admin=True),
+        Scenario("commission_bulk_update", "admin", "POST", "/api/commissions/bulk-update", bulk_patch, admin=True),
+        Scenario("commission_search", "admin", "GET", "/api/commissions/search?q=cliente", admin=True),
+        Scenario("dashboard_stats", "admin", "GET", "/api/dashboard/stats", admin=True),
+        Scenario("auth_me", "admin", "GET", "/api/auth/me", admin=True),
+        Scenario("portfolio_upload", "upload", "POST", "/api/portfolio/", portfolio_upload, expect=201),
+        Scenario("portfolio_batch_upload", "upload", "POST", "/api/portfolio/batch", batch_upload, admin=True),
+        Scenario("background_upload", "upload", "POST", "/api/settings/background-image", background_upload),
+        Scenario("profile_upload", "upload", "POST", "/api/settings/profile-image", profile_upload),
+    ]
+
+async def run_scenario(
+    client, scenario: Scenario, requests: int, concurrency: int, headers: dict, queries: list, first: int = 0
+) -> dict:
+    # Request bodies are built up front: encoding images inside the timed loop
+    # would block the event loop under the requests in flight
+    arguments = [scenario.build(i) if scenario.build else {} for i in range(first, first + requests)]
+    if scenario.admin:
+        for argument in arguments:
+            argument["headers"] = headers
+    latencies, failures = [], []
+    next_index = iter(range(requests))
+
+    async def worker():
+        for i in next_index:
+            started = time.perf_counter()
+            response = await client.request(scenario.method, scenario.path, **arguments[i])
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != scenario.expect:
+                failures.append(f"{response.status_code}: {response.text[:200]}")
+
+    queries.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "group": scenario.group,
+        "method": scenario.method,
+        "path": scenario.path,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(failures),
+        "first_error": failures[0] if failures else None,
+        "throughput_rps": round(requests / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3),
+        "queries_per_request": round(statistics.fmean(queries), 2) if queries else None,
+        "rss_mb": round(rss_mb(), 1),
+    }
+
+async def run_suite(args) -> dict:
+    import database
+    from migrations import apply_migrations
+    from models import CommissionRequest
+
+    apply_migrations(database.engine, log=lambda message: None)
+    seed(database.engine, args.rows)
+    with database.engine.connect() as conn:
+        commission_ids = [row.id for row in conn.execute(
+            CommissionRequest.__table__.select().order_by(CommissionRequest.created_at.desc())
+        )]
+
+    import httpx
+    import main as app_module
+    import metrics
+    from config import settings
+
+    # SQL statements of every finished request, for the scenario being run
+    queries: List[int] = []
+    metrics.request_hooks.append(lambda stats: queries.append(stats.queries))
+
+    app = app_module.app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            await client.post("/api/auth/create-admin", json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+            token = await client.post("/api/auth/token", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+            headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+
+            scenarios = build_scenarios(commission_ids)
+            if args.only:
+                selected = set(args.only.split(","))
+                unknown = selected - {scenario.name for scenario in scenarios}
+                if unknown:
+                    raise SystemExit(f"Cenários desconhecidos: {', '.join(sorted(unknown))}")
+                scenarios = [scenario for scenario in scenarios if scenario.name in selected]
+
+            print(f"{args.rows} linhas, concorrência {args.concurrency}\n")
+            print(f"{'cenário':<26}{'req':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'SQL/req':>9}{'erros':>7}")
+            results = {}
+            for scenario in scenarios:
+                requests = args.upload_requests if scenario.group == "upload" else args.requests
+                # Warm-up (caches, prepared statements, worker pools), not measured; its
+                # request indexes follow the measured ones so uploads stay distinct
+                await run_scenario(
+                    client, scenario, min(args.warmup, requests), args.concurrency, headers, queries, first=requests
+                )
+                result = await run_scenario(client, scenario, requests, args.concurrency, headers, queries)
+                results[scenario.name] = result
+                sql = "-" if result["queries_per_request"] is None else f"{result['queries_per_request']:.1f}"
+                print(
+                    f"{scenario.name:<26}{requests:>6}{result['throughput_rps']:>9.1f}"
+                    f"{result['p50_ms']:>7.1f}ms{result['p95_ms']:>7.1f}ms{result['p99_ms']:>7.1f}ms"
+                    f"{sql:>9}{result['errors']:>7}"
+                )
+                if result["first_error"]:
+                    print(f"  primeiro erro: {result['first_error']}")
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "rows": args.rows,
+            "requests": args.requests,
+            "upload_requests": args.upload_requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "only": args.only,
+            "database_async": settings.DATABASE_ASYNC,
+            "fast_json_responses": settings.FAST_JSON_RESPONSES,
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+        "scenarios": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000, help="commissions and portfolio items seeded")
+    parser.add_argument("--requests", type=int, default=300, help="requests per scenario")
+    parser.add_argument("--upload-requests", type=int, default=40, help="requests per upload scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests before each scenario")
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--output", default=os.path.join(BACKEND_DIR, "benchmarks", "results", "latest.json"))
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+
+    # Requests are measured without the slow-query log unless asked for
+    os.environ.setdefault("SLOW_QUERY_LOG", "false")
+    os.chdir(tempfile.mkdtemp(prefix="bench-suite-"))
+    sys.path.insert(0, BACKEND_DIR)
+
+    report = asyncio.run(run_suite(args))
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as results_file:
+        json.dump(report, results_file, indent=2)
+    print(f"\nResultados gravados em {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Bulk export and import of table rows (CSV / NDJSON).
+
+Exports are streamed in keyset-paginated batches of BULK_BATCH_SIZE rows, on
+a session of their own, ending the read transaction after every batch: memory
+stays constant whatever the table size and no snapshot is held open for the
+whole download.
+
+Imports read the uploaded file incrementally. Each batch of rows is parsed
+and validated on the threadpool, then inserted with a single executemany in
+its own transaction. Rows that fail validation or constraints are reported
+by line number instead of aborting the import.
+"""
+
+import csv
+import io
+import itertools
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Tuple, Type
+import orjson
+from fastapi import HTTPException, UploadFile, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from config import settings
+from database import open_session
+from fast_json import RowSerializer
+from pagination import keyset_page, split_rows
+from schemas import ImportReport, ImportRowError
+
+# Media type by format
+FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+FORMAT_PATTERN = "^(csv|ndjson)$"
+EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+def _csv_chunk(rows, fields: List[str], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(fields)
+    width = len(fields)
+    for row in rows:
+        writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row[:width]])
+    return buffer.getvalue().encode()
+
+def _ndjson_chunk(rows, fields: List[str]) -> bytes:
+    return b"".join(orjson.dumps(dict(zip(fields, row))) + b"\n" for row in rows)
+
+async def export_rows(serializer: RowSerializer, model, filters: list, export_format: str) -> AsyncIterator[bytes]:
+    """Body of a streamed export: the serializer's columns for every row matching `filters`, newest first."""
+    fields = serializer.fields
+    batch_size = settings.BULK_BATCH_SIZE
+    async with open_session() as db:
+        if export_format == "csv":
+            yield _csv_chunk([], fields, header=True)
+        after = None
+        while True:
+            query = serializer.select()
+            for condition in filters:
+                query = query.where(condition)
+            result = await db.execute(keyset_page(query, model, after, batch_size))
+            rows, after = split_rows(result.all(), batch_size)
+            # Release the read snapshot between batches
+            await db.rollback()
+            if rows:
+                yield _csv_chunk(rows, fields) if export_format == "csv" else _ndjson_chunk(rows, fields)
+            if after is None:
+                break
+
+def import_format(requested: Optional[str], filename: Optional[str]) -> str:
+    """The explicit format, else the one implied by the file extension."""
+    if requested:
+        return requested
+    inferred = EXTENSIONS.get(Path(filename or "").suffix.lower())
+    if inferred is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot infer the file format, pass format=csv or format=ndjson"
+        )
+    return inferred
+
+def _records(file, import_format: str) -> Iterator[Tuple[int, object]]:
+    """(line number, record) pairs; records that cannot be parsed are yielded as the exception."""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    if import_format == "csv":
+        reader = csv.DictReader(text)
+        for record in reader:
+            # Empty cells fall back to the defaults; cells past the header are ignored
+            yield reader.line_num, {
+                key: value for key, value in record.items() if key is not None and value not in (None, "")
+            }
+    else:
+        for number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                yield number, orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                yield number, e
+
+def validation_message(error: ValidationError) -> str:
+    """The field errors of `error` on one line, for per-row reports."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+def _next_batch(records, schema: Type[BaseModel], defaults: Callable[[], dict], size: int):
+    """Parse and validate up to `size` records: (valid (line, values) pairs, errors, exhausted)."""
+    valid, errors, taken, line = [], [], 0, 0
+    try:
+        for line, record in itertools.islice(records, size):
+            taken += 1
+            if isinstance(record, Exception):
+                errors.append(ImportRowError(line=line, error=f"Invalid JSON: {record}"))
+                continue
+            if not isinstance(record, dict):
+                errors.append(ImportRowError(line=line, error="Expected a JSON object"))
+                continue
+            try:
+                values = schema.model_validate(record).model_dump()
+            except ValidationError as e:
+                errors.append(ImportRowError(line=line, error=validation_message(e)))
+                continue
+            for key, value in defaults().items():
+                if values.get(key) is None:
+                    values[key] = value
+            valid.append((line, values))
+    except (UnicodeDecodeError, csv.Error) as e:
+        # The rest of the file cannot be read reliably
+        errors.append(ImportRowError(line=line + 1, error=f"Unreadable file, import stopped: {e}"))
+        return valid, errors, True
+    return valid, errors, taken < size
+
+async def _insert(db, model, rows: List[Tuple[int, dict]], errors: List[ImportRowError]) -> int:
+    if not rows:
+        return 0
+    # Core insert: a plain executemany, without the ORM bulk-insert bookkeeping
+    statement = model.__table__.insert()
+    try:
+        await db.execute(statement, [values for _, values in rows])
+        await db.commit()
+        return len(rows)
+    except IntegrityError:
+        await db.rollback()
+    # Some row broke a constraint (e.g. a duplicate id): retry one by one to find it
+    imported = 0
+    for line, values in rows:
+        try:
+            await db.execute(statement, [values])
+            await db.commit()
+            imported += 1
+        except IntegrityError as e:
+            await db.rollback()
+            errors.append(ImportRowError(line=line, error=str(e.orig)))
+    return imported
+
+async def import_rows(
+    db,
+    upload: UploadFile,
+    import_format: str,
+    schema: Type[BaseModel],
+    model,
+    defaults: Callable[[], dict],
+) -> ImportReport:
+    """
+    Insert the rows of an uploaded CSV/NDJSON file, validated with `schema`.
+
+    `defaults` supplies values for columns a row leaves empty (called per row).
+    """
+    records = _records(upload.file, import_format)
+    imported, failed, reported = 0, 0, []
+    max_reported = settings.IMPORT_MAX_REPORTED_ERRORS
+
+    def report(errors: List[ImportRowError]):
+        nonlocal failed
+        failed += len(errors)
+        reported.extend(errors[:max(0, max_reported - len(reported))])
+
+    while True:
+        rows, errors, exhausted = await run_in_threadpool(
+            _next_batch, records, schema, defaults, settings.BULK_BATCH_SIZE
+        )
+        insert_errors = []
+        imported += await _insert(db, model, rows, insert_errors)
+        report(sorted(errors + insert_errors, key=lambda error: error.line))
+        if exhausted:
+            break
+    return ImportReport(
+        imported=imported,
+        failed=failed,
+        errors=reported,
+        errors_truncated=failed > len(reported),
+    )
@@ -6,23 +6,94 @@ class Settings:
     
     # Database
     DATABASE_URL: str = "sqlite:///./database.db"
+    ASYNC_DATABASE_URL: str = "sqlite+aiosqlite:///./database.db"
+    # Use the aiosqlite engine; set DATABASE_ASYNC=false to fall back to the
+    # sync engine on the threadpool (useful for benchmarking both paths)
+    DATABASE_ASYNC: bool = os.getenv("DATABASE_ASYNC", "true").lower() == "true"
+    
+    # Connection pool (applies to both the sync and the async engine)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds
+    
+    # SQLite PRAGMAs applied on every new connection, by profile name
+    SQLITE_PRAGMA_PROFILE: str = os.getenv("SQLITE_PRAGMA_PROFILE", "production")
+    SQLITE_PRAGMA_PROFILES: dict = {
+        # SQLite defaults (rollback journal, no mmap, no busy timeout)
+        "default": {},
+        "production": {
+            "journal_mode": "WAL",  # readers no longer block behind writers
+            "synchronous": "NORMAL",  # safe with WAL, far fewer fsyncs
+            "cache_size": -64000,  # negative = KiB, i.e. 64MB page cache
+            "mmap_size": 268435456,  # 256MB memory-mapped reads
+            "temp_store": "MEMORY",
+            "busy_timeout": 5000,  # ms to wait on a lock instead of "database is locked"
+        },
+    }
     
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "minsk-art-secret-key-change-in-production")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # bcrypt cost (2^rounds iterations); stored hashes with another cost are
+    # rehashed on the next successful login
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    # Password hashing process pool, and how many calls may wait for it before 503
+    PASSWORD_WORKERS: int = int(os.getenv("PASSWORD_WORKERS", "2"))
+    PASSWORD_QUEUE_LIMIT: int = int(os.getenv("PASSWORD_QUEUE_LIMIT", "16"))
+    
+    # Site settings cache: seconds before an in-process copy is reloaded, so
+    # other workers' writes are picked up (0 = only write-through updates)
+    SETTINGS_CACHE_TTL: int = int(os.getenv("SETTINGS_CACHE_TTL", "300"))
+    
+    # Serve large list endpoints from column tuples encoded with orjson,
+    # skipping ORM loading and per-row pydantic validation (see fast_json.py)
+    FAST_JSON_RESPONSES: bool = os.getenv("FAST_JSON_RESPONSES", "false").lower() == "true"
+    
+    # Rows per query/transaction in the commission export and import
+    BULK_BATCH_SIZE: int = int(os.getenv("BULK_BATCH_SIZE", "2000"))
+    # Failed import rows listed in the response (the rest are only counted)
+    IMPORT_MAX_REPORTED_ERRORS: int = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))
+    
+    # Prometheus-format /metrics endpoint and request/SQL instrumentation
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    
+    # Slow-query log: statements over SLOW_QUERY_MS are logged with their query
+    # plan; requests over QUERY_BUDGET statements are logged as likely N+1
+    SLOW_QUERY_LOG: bool = os.getenv("SLOW_QUERY_LOG", "true").lower() == "true"
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "100"))
+    QUERY_BUDGET: int = int(os.getenv("QUERY_BUDGET", "25"))
+    QUERY_LOG_SIZE: int = int(os.getenv("QUERY_LOG_SIZE", "50"))  # entries kept for /api/dashboard/queries
+    
+    # Authenticated-user cache (principal by token subject): LRU size and seconds
+    # before a cached user is re-read, bounding staleness across worker processes
+    AUTH_USER_CACHE_SIZE: int = int(os.getenv("AUTH_USER_CACHE_SIZE", "1024"))
+    AUTH_USER_CACHE_TTL: int = int(os.getenv("AUTH_USER_CACHE_TTL", "60"))
     
     # File Upload
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     MAX_BACKGROUND_SIZE: int = 20 * 1024 * 1024  # 20MB
     MAX_PROFILE_SIZE: int = 5 * 1024 * 1024  # 5MB
     ALLOWED_EXTENSIONS: set = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+    UPLOAD_CHUNK_SIZE: int = 256 * 1024  # bytes buffered per upload while streaming to disk
+    # Portfolio batch upload: files per request, request body limit, files stored at once
+    BATCH_UPLOAD_MAX_FILES: int = int(os.getenv("BATCH_UPLOAD_MAX_FILES", "100"))
+    MAX_BATCH_UPLOAD_SIZE: int = int(os.getenv("MAX_BATCH_UPLOAD_SIZE", str(200 * 1024 * 1024)))  # 200MB
+    BATCH_UPLOAD_CONCURRENCY: int = int(os.getenv("BATCH_UPLOAD_CONCURRENCY", "4"))
+    
+    # Responsive derivatives generated for portfolio uploads (name -> max width in px)
+    IMAGE_DERIVATIVE_SIZES: dict = {"thumb": 320, "medium": 800, "large": 1600}
+    IMAGE_DERIVATIVE_FORMAT: str = "WEBP"
+    IMAGE_DERIVATIVE_QUALITY: int = 80
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", "2"))  # resize process pool size
     
     # Upload Directories
     UPLOAD_DIR: str = "uploads"
     PORTFOLIO_UPLOAD_DIR: str = "uploads/portfolio"
     PROFILE_UPLOAD_DIR: str = "uploads/profiles"
     BACKGROUND_UPLOAD_DIR: str = "uploads/backgrounds"
+    # Content-addressed store: uploads/blobs/ab/cd/abcd...<sha256>.<ext>
+    BLOB_UPLOAD_DIR: str = "uploads/blobs"
     
     # CORS
     ALLOWED_ORIGINS: list = [
@@ -46,15 +117,32 @@ class Settings:
         return cls.DATABASE_URL
     
     @classmethod
-    def create_upload_dirs(cls) -> None:
-        """Create upload directories if they don't exist."""
-        dirs = [
+    def get_async_database_url(cls) -> str:
+        """Get async (aiosqlite) database URL."""
+        return cls.ASYNC_DATABASE_URL
+    
+    @classmethod
+    def get_sqlite_pragmas(cls) -> dict:
+        """Get the PRAGMAs of the active SQLite profile."""
+        if cls.SQLITE_PRAGMA_PROFILE not in cls.SQLITE_PRAGMA_PROFILES:
+            raise ValueError(f"Unknown SQLite pragma profile: {cls.SQLITE_PRAGMA_PROFILE}")
+        return cls.SQLITE_PRAGMA_PROFILES[cls.SQLITE_PRAGMA_PROFILE]
+    
+    @classmethod
+    def upload_dirs(cls) -> list:
+        """Directories uploads are written to."""
+        return [
             cls.UPLOAD_DIR,
             cls.PORTFOLIO_UPLOAD_DIR,
             cls.PROFILE_UPLOAD_DIR,
-            cls.BACKGROUND_UPLOAD_DIR
+            cls.BACKGROUND_UPLOAD_DIR,
+            cls.BLOB_UPLOAD_DIR
         ]
-        for directory in dirs:
+    
+    @classmethod
+    def create_upload_dirs(cls) -> None:
+        """Create upload directories if they don't exist."""
+        for directory in cls.upload_dirs():
             os.makedirs(directory, exist_ok=True)
 
 # Global settings instance
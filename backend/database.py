@@ -1,17 +1,138 @@
-from sqlalchemy import create_engine
+from contextlib import asynccontextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.orm import sessionmaker, declarative_base
+from starlette.concurrency import run_in_threadpool
+from config import settings
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./database.db"
+SQLALCHEMY_DATABASE_URL = settings.get_database_url()
+
+POOL_OPTIONS = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+}
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply the configured PRAGMA profile to a new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in settings.get_sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, **POOL_OPTIONS
 )
+event.listen(engine, "connect", apply_sqlite_pragmas)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Async engine (aiosqlite). Only created when the async path is enabled so the
+# sync fallback does not require the driver to be installed.
+async_engine = None
+AsyncSessionLocal = None
+if settings.DATABASE_ASYNC:
+    # aiosqlite defaults to NullPool for file databases, which reconnects (and
+    # re-applies the PRAGMAs) on every checkout, so pool explicitly
+    async_engine = create_async_engine(
+        settings.get_async_database_url(), poolclass=AsyncAdaptedQueuePool, **POOL_OPTIONS
+    )
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+class ThreadedSession:
+    """
+    Sync Session exposed through the AsyncSession API.
+
+    Every call that touches the database runs on the threadpool, which is how
+    the routers behaved before the async port. Used when DATABASE_ASYNC is off.
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    def _execute(self, statement, params=None, **kwargs):
+        result = self.sync_session.execute(statement, params, **kwargs)
+        # Buffer rows on the worker thread, like AsyncSession does. Plain DML
+        # cursor results carry no rows (only rowcount) and are returned as is.
+        if not getattr(result, "returns_rows", True):
+            return result
+        return result.freeze()()
+
+    async def execute(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self._execute, statement, params, **kwargs)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        result = await self.execute(statement, params, **kwargs)
+        return result.scalar()
+
+    async def scalars(self, statement, params=None, **kwargs):
+        result = await self.execute(statement, params, **kwargs)
+        return result.scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+def describe_sqlite_settings() -> dict:
+    """Read back the PRAGMAs and pool sizing actually in effect."""
+    with engine.connect() as conn:
+        active = {
+            name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in ("journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store", "busy_timeout")
+        }
+    return {
+        "profile": settings.SQLITE_PRAGMA_PROFILE,
+        "async": settings.DATABASE_ASYNC,
+        "pragmas": active,
+        "pool": POOL_OPTIONS,
+    }
+
+async def dispose_engines() -> None:
+    """Close pooled connections (aiosqlite keeps one worker thread per connection)."""
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+
+async def get_db():
+    if settings.DATABASE_ASYNC:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = ThreadedSession(SessionLocal())
+        try:
+            yield db
+        finally:
+            await db.close()
+
+# The get_db session as a context manager, for work that outlives the request
+# handler (e.g. the body of a streamed response)
+open_session = asynccontextmanager(get_db)
@@ -0,0 +1,34 @@
+"""
+Fast JSON path for large list responses (opt-in: FAST_JSON_RESPONSES=true).
+
+The regular path loads ORM objects, validates each one through its Read
+schema (from_attributes) and encodes the result with the stdlib json. Rows
+coming from our own tables are already valid, so this path selects only the
+schema's columns as plain tuples, zips them into dicts and encodes them with
+orjson, skipping the ORM identity map and pydantic validation altogether.
+The JSON produced is the same; see benchmarks/json_lists.py.
+"""
+
+from typing import List, Type
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy import select
+
+class RowSerializer:
+    """Column select and JSON rendering of a Read schema over a model."""
+
+    def __init__(self, schema: Type[BaseModel], model):
+        fields = [name for name in schema.model_fields if name != "id"]
+        # id first: pagination.split_rows takes the cursor id from column 0
+        self.fields: List[str] = ["id", *fields]
+        self.columns = [getattr(model, name) for name in self.fields]
+
+    def select(self):
+        return select(*self.columns)
+
+    def render(self, rows, headers) -> ORJSONResponse:
+        """Response for `rows` of select(), keeping the headers already set on the handler's response."""
+        fields = self.fields
+        # zip stops at the schema fields, dropping extra columns such as the cursor key
+        content = [dict(zip(fields, row)) for row in rows]
+        return ORJSONResponse(content, headers=dict(headers))
@@ -0,0 +1,86 @@
+"""
+HTTP conditional GET helpers (ETag / Last-Modified).
+
+Handlers compute validators from cheap state (a table version bumped by
+triggers, or a cached content hash), answer 304 before running the real
+query or serializing anything, and otherwise attach the validators to the
+full response.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+from fastapi import Request, Response, status
+from sqlalchemy import select
+from models import TableVersion
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the values that fully determine a response body."""
+    raw = json.dumps(parts, separators=(",", ":"), default=str).encode()
+    return f'"{hashlib.sha1(raw).hexdigest()}"'
+
+def _as_utc(moment: datetime) -> datetime:
+    # SQLite returns naive datetimes; CURRENT_TIMESTAMP is UTC
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).replace(microsecond=0)
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison, as RFC 9110 requires for If-None-Match
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        return etag in candidates or f"W/{etag}" in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return _as_utc(last_modified) <= since
+    return False
+
+def _validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    # no-cache: clients may store the body but must revalidate each time
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime]) -> None:
+    response.headers.update(_validator_headers(etag, last_modified))
+
+def not_modified(etag: str, last_modified: Optional[datetime]) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_validator_headers(etag, last_modified))
+
+async def read_table_versions(db, *tables: str) -> Tuple[list, Optional[datetime]]:
+    """Current versions of `tables` (in order) and their latest write time, in one query."""
+    result = await db.execute(
+        select(TableVersion.name, TableVersion.version, TableVersion.modified_at)
+        .where(TableVersion.name.in_(tables))
+    )
+    rows = {name: (version, modified_at) for name, version, modified_at in result.all()}
+    versions = [rows.get(table, (0, None))[0] for table in tables]
+    stamps = [rows[table][1] for table in tables if table in rows and rows[table][1] is not None]
+    return versions, max(stamps) if stamps else None
+
+async def conditional_on_tables(request: Request, response: Response, db, *tables: str) -> Optional[Response]:
+    """
+    Validators for a response built only from `tables` and the query string.
+
+    Returns a ready 304 response when the client copy is current; otherwise
+    sets ETag/Last-Modified on `response` and returns None.
+    """
+    versions, last_modified = await read_table_versions(db, *tables)
+    etag = make_etag(request.url.path, str(request.query_params), versions)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
+    return None
@@ -0,0 +1,175 @@
+"""
+Responsive image derivatives for portfolio uploads.
+
+Each upload gets resized copies (see IMAGE_DERIVATIVE_SIZES) written next to
+the original, so the gallery can pick one through ``srcset`` instead of
+downloading the full-size file. Resizing is CPU bound and runs in a process
+pool, off the event loop.
+
+Backfill items uploaded before derivatives existed with:
+
+    python images.py backfill
+"""
+
+import asyncio
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Dict, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+class InvalidImage(ValueError):
+    """The uploaded file cannot be decoded as an image."""
+
+def generate_derivatives(source_path: str, sizes: Dict[str, int], image_format: str, quality: int) -> dict:
+    """
+    Write the resized copies of `source_path` and describe them.
+
+    Runs in a worker process. Sizes wider than the original are skipped
+    (never upscale) and animated images are left alone. Raises InvalidImage
+    when Pillow cannot decode the file.
+    """
+    from PIL import Image, ImageOps
+
+    # Decoded once, up front: the resizes below reuse the pixels, and a file
+    # that cannot be read fails here rather than while writing derivatives
+    try:
+        original = Image.open(source_path)
+        original.load()
+    except Exception:
+        raise InvalidImage("File is not a valid image") from None
+
+    variants = {}
+    stem = os.path.splitext(source_path)[0]
+    extension = "." + image_format.lower()
+    with original:
+        if getattr(original, "is_animated", False):
+            return variants
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or "A" in image.mode else "RGB")
+        for name, width in sizes.items():
+            if width >= image.width:
+                continue
+            height = max(1, round(image.height * width / image.width))
+            path = f"{stem}-{name}{extension}"
+            # Blobs are content-addressed: an existing derivative is already this one
+            if not os.path.exists(path):
+                # Per worker: two uploads of the same blob may render it concurrently
+                temp_path = f"{path}.{os.getpid()}.tmp"
+                image.resize((width, height), Image.LANCZOS).save(temp_path, image_format, quality=quality)
+                os.replace(temp_path, path)
+            variants[name] = {"file": os.path.basename(path), "width": width, "height": height}
+    return variants
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # forkserver, not fork: the pool starts on the first upload, when the server
+        # already runs threads (aiosqlite, the threadpool) whose locks a forked
+        # child could inherit held. Workers fork from a clean single-threaded
+        # server that has this module preloaded.
+        context = get_context("forkserver")
+        context.set_forkserver_preload(["images"])
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS, mp_context=context)
+    return _pool
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _to_variants(generated: dict, base_url: str) -> dict:
+    return {
+        name: {"url": f"{base_url}/{info['file']}", "width": info["width"], "height": info["height"]}
+        for name, info in generated.items()
+    }
+
+async def create_variants(file_path: str, base_url: str) -> dict:
+    """
+    Generate the derivatives of an uploaded image in the process pool.
+
+    Returns {size name: {url, width, height}}; raises InvalidImage when the
+    file cannot be decoded. Any other failure returns {} and only the
+    original is served.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        generated = await loop.run_in_executor(
+            get_pool(),
+            generate_derivatives,
+            # Absolute: the workers do not share the server's working directory
+            os.path.abspath(file_path),
+            settings.IMAGE_DERIVATIVE_SIZES,
+            settings.IMAGE_DERIVATIVE_FORMAT,
+            settings.IMAGE_DERIVATIVE_QUALITY,
+        )
+    except BrokenProcessPool as e:
+        # A worker died (e.g. OOM on a huge image); start a fresh pool next time
+        logger.error("Image worker pool broke while processing %s: %s", file_path, e)
+        shutdown_pool()
+        return {}
+    except InvalidImage:
+        raise
+    except Exception as e:
+        logger.warning("Could not generate derivatives for %s: %s", file_path, e)
+        return {}
+    return _to_variants(generated, base_url)
+
+def remove_variants(variants: Optional[dict]) -> None:
+    """Delete the derivative files of an item stored outside the blob store."""
+    for variant in (variants or {}).values():
+        file_path = variant["url"].lstrip("/")
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+def backfill() -> None:
+    """Generate derivatives for portfolio items that have none yet."""
+    from sqlalchemy import select
+    from database import SessionLocal
+    from models import PortfolioItem
+
+    db = SessionLocal()
+    try:
+        items = db.scalars(select(PortfolioItem).where(PortfolioItem.image_variants.is_(None))).all()
+        print(f"🖼️ {len(items)} item(ns) sem derivados")
+        pending = {}
+        for item in items:
+            file_path = item.image_url.lstrip("/")
+            if not item.image_url.startswith("/uploads/") or not os.path.exists(file_path):
+                print(f"   ⚠️ arquivo não encontrado: {item.image_url}")
+                continue
+            pending[item.id] = (item, get_pool().submit(
+                generate_derivatives,
+                os.path.abspath(file_path),
+                settings.IMAGE_DERIVATIVE_SIZES,
+                settings.IMAGE_DERIVATIVE_FORMAT,
+                settings.IMAGE_DERIVATIVE_QUALITY,
+            ))
+        for item, future in pending.values():
+            try:
+                generated = future.result()
+            except Exception as e:
+                # Left as NULL so the next backfill retries it
+                print(f"   ❌ {item.image_url}: {e}")
+                continue
+            item.image_variants = _to_variants(generated, os.path.dirname(item.image_url))
+            db.commit()
+            print(f"   ✅ {item.image_url}: {', '.join(item.image_variants) or 'sem derivados'}")
+    finally:
+        db.close()
+        shutdown_pool()
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["backfill"]:
+        print("Uso: python images.py backfill")
+        sys.exit(1)
+    backfill()
@@ -1,24 +1,40 @@
 """
 Script para inicializar o banco de dados com dados de exemplo.
 Execute este script após instalar as dependências para configurar o backend.
+
+    python init_db.py                                            # admin, configurações e exemplos
+    python init_db.py --scale commissions=1000000,portfolio=50000 [--seed 42] [--images 64]
+
+O modo --scale gera dados sintéticos reprodutíveis em volume, para testes de
+carga (veja generate_scale).
 """
 
+import argparse
+import asyncio
+import io
+import random
 import sys
 import os
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from database import engine, Base, SessionLocal
+from config import settings
+from database import engine, SessionLocal
+from migrations import apply_migrations
 from models import User, SiteSetting, PortfolioItem, CommissionRequest, PortfolioCategory
-from passlib.context import CryptContext
+from passwords import hash_password
+from stats import recount
+from storage import BLOB_URL_PREFIX, blob_relative_path, recount_blobs
+import hashlib
 import uuid
 import json
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 def create_tables():
-    """Criar todas as tabelas do banco de dados."""
+    """Criar todas as tabelas do banco de dados (aplicando as migrações)."""
     print("🗄️ Criando tabelas do banco de dados...")
-    Base.metadata.create_all(bind=engine)
+    apply_migrations(engine, log=lambda message: print(f"   {message}"))
     print("✅ Tabelas criadas com sucesso!")
 
 def create_admin_user(db: Session):
@@ -32,7 +48,7 @@ def create_admin_user(db: Session):
         return existing_admin
     
     # Criar admin
-    hashed_password = pwd_context.hash("admin123")  # Senha padrão
+    hashed_password = hash_password("admin123")  # Senha padrão
     admin_user = User(
         id=str(uuid.uuid4()),
         email="admin@minsk.art",
@@ -239,7 +255,8 @@ def create_upload_directories():
         "uploads",
         "uploads/portfolio", 
         "uploads/profiles",
-        "uploads/backgrounds"
+        "uploads/backgrounds",
+        "uploads/blobs"
     ]
     
     for directory in directories:
@@ -247,8 +264,336 @@ def create_upload_directories():
     
     print("✅ Diretórios de upload criados!")
 
+# Dados sintéticos (modo --scale)
+
+SCALE_TABLES = {"commissions": CommissionRequest, "portfolio": PortfolioItem}
+# Índice FTS5 de cada tabela (veja as migrações 0007 e 0008)
+SCALE_SEARCH_TABLES = {"commissions": "commission_search", "portfolio": "portfolio_search"}
+SCALE_BATCH_SIZE = 50_000
+# Termos pendentes que o FTS5 acumula em memória antes de gravar um segmento
+# (padrão 1 MB): menos segmentos e menos merges ao indexar as linhas novas
+SCALE_FTS_HASHSIZE = 64 * 1024 * 1024
+FTS_DEFAULT_HASHSIZE = 1024 * 1024
+# Datas relativas a um instante fixo, para que a mesma semente gere os mesmos dados
+SCALE_START = datetime(2023, 1, 1)
+SCALE_SPAN = timedelta(days=3 * 365)
+
+FIRST_NAMES = [
+    "Ana", "Bruno", "Camila", "Diego", "Eduarda", "Felipe", "Gabriela", "Heitor", "Isabela", "João",
+    "Júlia", "Lucas", "Mariana", "Mateus", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Thiago",
+    "Valentina", "Vinícius", "Yasmin", "Arthur", "Beatriz", "Caio", "Larissa", "Miguel", "Lívia", "Enzo",
+]
+LAST_NAMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+    "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa",
+]
+EMAIL_DOMAINS = ["gmail.com", "hotmail.com", "outlook.com", "yahoo.com.br", "uol.com.br"]
+COMMISSION_TYPES = ["Ícone", "Meio Corpo", "Corpo Todo", "Emotes", "Banner", "Wallpaper", "Badges", "Chibi"]
+SUBJECTS = [
+    "do meu personagem de RPG", "da minha OC", "do meu gato", "do meu avatar da stream",
+    "de um casal de personagens", "de uma maga élfica", "de um cavaleiro com armadura", "do meu mascote",
+]
+DETAILS = [
+    "com cabelos longos azuis e túnica roxa", "segurando um cajado com cristais", "em pose dinâmica",
+    "com fundo simples", "em estilo fofo, cores pastel", "com iluminação noturna e neon",
+    "sorrindo, expressão animada", "com asas e detalhes dourados",
+]
+NOTES = ["Cliente pediu prazo curto", "Referências enviadas no Discord", "Aguardando aprovação do esboço", "Pagar via PIX"]
+# (status, payment_status, progress_status) e peso, seguindo o ciclo de uma comissão
+COMMISSION_STATES = [
+    (("pending", "pending", "in_queue"), 25),
+    (("pending", "pending", "waiting_payment"), 10),
+    (("50_paid", "50_paid", "in_queue"), 10),
+    (("50_paid", "50_paid", "in_progress"), 20),
+    (("100_paid", "100_paid", "in_progress"), 10),
+    (("completed", "100_paid", "completed"), 25),
+]
+PORTFOLIO_CATEGORIES = [
+    ("Chibi", 25), ("Emotes", 20), ("Banners", 10), ("Concept Art", 15),
+    ("Ilustração", 15), ("Badges", 5), ("Wallpaper", 5), ("Fanart", 5),
+]
+ART_NOUNS = ["Guerreira", "Dragão", "Feiticeira", "Raposa", "Samurai", "Sereia", "Astronauta", "Bruxa", "Lobo", "Fada"]
+ART_ADJECTIVES = ["Mística", "Neon", "Celestial", "Sombria", "Encantada", "Cyberpunk", "Floral", "Lunar", "Radiante", "Pastel"]
+
+def parse_scale(spec: str) -> dict:
+    """'commissions=1000000,portfolio=50000' -> {"commissions": 1000000, "portfolio": 50000}."""
+    counts = {}
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        name = name.strip()
+        if name not in SCALE_TABLES or not value.strip().replace("_", "").isdigit():
+            raise argparse.ArgumentTypeError(
+                f"use tabela=quantidade com tabela em {', '.join(SCALE_TABLES)} (recebido: {part!r})"
+            )
+        counts[name] = int(value)
+    return counts
+
+def _ascii(text: str) -> str:
+    return text.lower().translate(str.maketrans("áâãàéêíóôõúüç", "aaaaeeiooouuc"))
+
+# Combinações prontas: sortear uma por linha é bem mais barato que montar o texto
+PEOPLE = [
+    (f"{first} {last}", f"{_ascii(first)}{_ascii(last)}", f"{_ascii(first)}.{_ascii(last)}")
+    for first in FIRST_NAMES for last in LAST_NAMES
+]
+DESCRIPTIONS = [
+    f"{kind} {subject}, {detail}. {extra.capitalize()}."
+    for kind in COMMISSION_TYPES for subject in SUBJECTS for detail in DETAILS for extra in DETAILS
+    if extra != detail
+]
+ART_TITLES = [f"{noun} {adjective}" for noun in ART_NOUNS for adjective in ART_ADJECTIVES]
+
+def _uuids(rng: random.Random, count: int) -> list:
+    """`count` UUIDs v4 em texto, tirados de `rng` (uuid.uuid4 não aceita semente)."""
+    ids = []
+    for _ in range(count):
+        digits = f"{rng.getrandbits(128):032x}"
+        ids.append(
+            f"{digits[:8]}-{digits[8:12]}-4{digits[13:16]}-{'89ab'[int(digits[16], 16) & 3]}{digits[17:20]}-{digits[20:]}"
+        )
+    return ids
+
+def _timestamps(rng: random.Random, start: int, count: int, total: int) -> list:
+    """
+    (created_at, updated_at) crescentes ao longo de SCALE_SPAN, com um pouco
+    de ruído, já no texto que o SQLAlchemy grava no SQLite.
+    """
+    step = SCALE_SPAN.total_seconds() / total
+    random_value = rng.random
+    # Segundos desde SCALE_START (meia-noite) montados com as datas e horas em
+    # tabelas: o mesmo texto de datetime.isoformat(" ", "microseconds"), sem
+    # criar e formatar dois datetime por linha
+    last_day = (int((start + count) * step) + 3600 + 30 * 86400) // 86400
+    dates = [(SCALE_START + timedelta(days=day)).strftime("%Y-%m-%d ") for day in range(last_day + 1)]
+    times = _times_of_day()
+    timestamps = []
+    for index in range(start, start + count):
+        created_at = int(index * step + random_value() * 3600)
+        updated_at = created_at + int(random_value() * 30 * 86400)
+        timestamps.append((
+            dates[created_at // 86400] + times[created_at % 86400],
+            dates[updated_at // 86400] + times[updated_at % 86400],
+        ))
+    return timestamps
+
+@lru_cache(maxsize=None)
+def _times_of_day() -> list:
+    """"HH:MM:SS.000000" de cada segundo do dia."""
+    return [f"{hour:02d}:{minute:02d}:{second:02d}.000000"
+            for hour in range(24) for minute in range(60) for second in range(60)]
+
+def commission_rows(rng: random.Random, start: int, count: int, total: int) -> list:
+    states, weights = zip(*COMMISSION_STATES)
+    rows = []
+    for index, uid, (full_name, handle, mailbox), domain, description, state, (created_at, updated_at), extras in zip(
+        range(start, start + count),
+        _uuids(rng, count),
+        rng.choices(PEOPLE, k=count),
+        rng.choices(EMAIL_DOMAINS, k=count),
+        rng.choices(DESCRIPTIONS, k=count),
+        rng.choices(states, weights, k=count),
+        _timestamps(rng, start, count, total),
+        rng.choices(range(10), k=count),
+    ):
+        rows.append({
+            "id": uid,
+            "full_name": full_name,
+            "discord_id": f"{handle}#{index % 10000:04d}",
+            "email": f"{mailbox}{index}@{domain}",
+            "project_description": description,
+            "status": state[0],
+            "payment_status": state[1],
+            "progress_status": state[2],
+            # ~20% com referência, ~30% com observações
+            "file_reference": f"https://exemplo.com/referencias/{index}.jpg" if extras < 2 else None,
+            "notes": NOTES[extras % len(NOTES)] if extras >= 7 else None,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        })
+    return rows
+
+def portfolio_rows(rng: random.Random, start: int, count: int, total: int, images: list) -> list:
+    categories, weights = zip(*PORTFOLIO_CATEGORIES)
+    rows = []
+    for index, uid, category, title, subject, detail, featured, (created_at, updated_at) in zip(
+        range(start, start + count),
+        _uuids(rng, count),
+        rng.choices(categories, weights, k=count),
+        rng.choices(ART_TITLES, k=count),
+        rng.choices(SUBJECTS, k=count),
+        rng.choices(DETAILS, k=count),
+        rng.choices((True, False), (3, 97), k=count),
+        _timestamps(rng, start, count, total),
+    ):
+        if images:
+            image_url, image_variants = images[index % len(images)]
+        else:
+            image_url, image_variants = f"/uploads/portfolio/placeholder-{index % 64}.png", None
+        rows.append({
+            "id": uid,
+            "title": f"{title} #{index}",
+            "description": f"{category} {subject}, {detail}.",
+            "category": category,
+            "image_url": image_url,
+            "image_variants": image_variants,
+            "is_featured": featured,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        })
+    return rows
+
+def placeholder_png(rng: random.Random) -> bytes:
+    """Imagem 1200x900 com formas aleatórias, só para ter arquivos reais."""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (1200, 900), tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(6):
+        x, y = rng.randrange(1000), rng.randrange(700)
+        box = (x, y, x + rng.randrange(80, 400), y + rng.randrange(80, 400))
+        fill = tuple(rng.randrange(256) for _ in range(3))
+        (draw.ellipse if rng.random() < 0.5 else draw.rectangle)(box, fill=fill)
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+def create_placeholder_images(rng: random.Random, count: int) -> list:
+    """Grava `count` imagens no armazenamento por conteúdo, com derivados: [(url, variants em JSON)]."""
+    from images import create_variants, shutdown_pool
+
+    print(f"🖼️ Criando {count} imagens de exemplo...")
+    stored = []
+    for _ in range(count):
+        data = placeholder_png(rng)
+        relative_path = blob_relative_path(hashlib.sha256(data).hexdigest(), ".png")
+        path = os.path.join(settings.BLOB_UPLOAD_DIR, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as image_file:
+            image_file.write(data)
+        stored.append((path, BLOB_URL_PREFIX + relative_path))
+
+    async def generate():
+        return await asyncio.gather(*(create_variants(path, os.path.dirname(url)) for path, url in stored))
+
+    try:
+        variants = asyncio.run(generate())
+    finally:
+        shutdown_pool()
+    return [
+        (url, json.dumps(image_variants) if image_variants else None)
+        for (_, url), image_variants in zip(stored, variants)
+    ]
+
+@contextmanager
+def deferred_schema(conn, tables: list):
+    """
+    Remove os triggers e índices secundários de `tables` e os recria ao
+    final (na mesma transação).
+    
+    Os triggers mantêm contadores, versões, índices de busca e referências de
+    imagens linha a linha, e cada índice é atualizado a cada linha inserida
+    (ids aleatórios caem em páginas aleatórias); em uma carga em massa é bem
+    mais rápido recalcular e reconstruir tudo de uma vez no final.
+    """
+    placeholders = ", ".join(f"'{table}'" for table in tables)
+    # Índices automáticos (chave primária, unique) não têm sql e ficam
+    objects = conn.exec_driver_sql(
+        f"SELECT type, name, sql FROM sqlite_master "
+        f"WHERE type IN ('trigger', 'index') AND sql IS NOT NULL AND tbl_name IN ({placeholders})"
+    ).all()
+    for object_type, name, _ in objects:
+        conn.exec_driver_sql(f'DROP {object_type.upper()} "{name}"')
+    yield
+    for _, _, sql in objects:
+        conn.exec_driver_sql(sql)
+
+def generate_scale(counts: dict, seed: int, image_count: int):
+    """
+    Inserir dados sintéticos em volume (`counts`: tabela -> linhas).
+    
+    Os dados são reprodutíveis: a mesma semente sobre o mesmo banco gera as
+    mesmas linhas (a semente de cada tabela inclui quantas linhas ela já tem,
+    então execuções seguidas acrescentam linhas novas). As linhas são
+    inseridas com executemany do Core em lotes de SCALE_BATCH_SIZE, em uma
+    única transação, com os triggers removidos; contadores, versões das
+    tabelas e referências de imagens são recalculados no fim, e só as linhas
+    novas entram nos índices de busca.
+    """
+    images = create_placeholder_images(random.Random(f"{seed}:images"), image_count) if image_count else []
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        # Cache maior para as inserções nos índices (uuid aleatório)
+        conn.exec_driver_sql("PRAGMA cache_size = -262144")
+        conn.commit()
+        with conn.begin(), deferred_schema(conn, [model.__tablename__ for model in SCALE_TABLES.values()]):
+            # Último rowid de cada tabela antes da carga: só as linhas depois dele são indexadas
+            last_rowids = {}
+            for name, total in counts.items():
+                model = SCALE_TABLES[name]
+                table_started = time.perf_counter()
+                existing, last_rowids[name] = conn.exec_driver_sql(
+                    f"SELECT count(*), coalesce(max(rowid), 0) FROM {model.__tablename__}"
+                ).one()
+                rng = random.Random(f"{seed}:{name}:{existing}")
+                # Direto no driver: os valores já vêm como são gravados (datas em texto,
+                # JSON serializado), e o executemany do sqlite3 lê os dicts pelos nomes,
+                # sem o processamento de parâmetros do SQLAlchemy a cada linha
+                columns = model.__table__.columns.keys()
+                statement = (
+                    f"INSERT INTO {model.__tablename__} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join(':' + column for column in columns)})"
+                )
+                print(f"📦 Inserindo {total} linhas em {model.__tablename__}...")
+                for start in range(0, total, SCALE_BATCH_SIZE):
+                    count = min(SCALE_BATCH_SIZE, total - start)
+                    if name == "commissions":
+                        rows = commission_rows(rng, existing + start, count, existing + total)
+                    else:
+                        rows = portfolio_rows(rng, existing + start, count, existing + total, images)
+                    conn.exec_driver_sql(statement, rows)
+                print(f"   {total} linhas em {time.perf_counter() - table_started:.1f}s")
+            
+            print("🔁 Recriando índices e recalculando contadores, versões, busca e referências de imagens...")
+            recount(conn)
+            conn.exec_driver_sql(
+                "UPDATE table_versions SET version = version + 1, modified_at = CURRENT_TIMESTAMP "
+                "WHERE name IN ('commissions', 'portfolio_items')"
+            )
+            for name, last_rowid in last_rowids.items():
+                search_table = SCALE_SEARCH_TABLES[name]
+                search_columns = ", ".join(row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({search_table})"))
+                # Um único INSERT ... SELECT, sem merges incrementais; sem optimize no fim:
+                # com segmentos grandes ele quase não muda o tempo das buscas.
+                # 4 é o automerge padrão do FTS5.
+                conn.exec_driver_sql(f"INSERT INTO {search_table} ({search_table}, rank) VALUES ('automerge', 0)")
+                conn.exec_driver_sql(
+                    f"INSERT INTO {search_table} ({search_table}, rank) VALUES ('hashsize', {SCALE_FTS_HASHSIZE})"
+                )
+                conn.exec_driver_sql(
+                    f"INSERT INTO {search_table} (rowid, {search_columns}) "
+                    f"SELECT rowid, {search_columns} FROM {SCALE_TABLES[name].__tablename__} WHERE rowid > {last_rowid}"
+                )
+                conn.exec_driver_sql(
+                    f"INSERT INTO {search_table} ({search_table}, rank) VALUES ('hashsize', {FTS_DEFAULT_HASHSIZE})"
+                )
+                conn.exec_driver_sql(f"INSERT INTO {search_table} ({search_table}, rank) VALUES ('automerge', 4)")
+            recount_blobs(conn)
+    print(f"✅ Dados sintéticos gerados em {time.perf_counter() - started:.1f}s")
+
 def main():
     """Função principal de inicialização."""
+    parser = argparse.ArgumentParser(description="Inicializar o banco de dados")
+    parser.add_argument(
+        "--scale", type=parse_scale,
+        help="gerar dados sintéticos em volume, ex. commissions=1000000,portfolio=50000"
+    )
+    parser.add_argument("--seed", type=int, default=42, help="semente dos dados sintéticos")
+    parser.add_argument(
+        "--images", type=int, default=0,
+        help="com --scale: criar N imagens de exemplo (com derivados) compartilhadas pelos itens"
+    )
+    args = parser.parse_args()
+    
     print("🚀 Inicializando banco de dados do MINSK Art Backend...")
     print("=" * 50)
     
@@ -266,8 +611,11 @@ def main():
             # Criar dados iniciais
             create_admin_user(db)
             create_default_settings(db)
-            create_sample_portfolio(db)
-            create_sample_commission(db)
+            if args.scale:
+                generate_scale(args.scale, args.seed, args.images)
+            else:
+                create_sample_portfolio(db)
+                create_sample_commission(db)
             
             print("=" * 50)
             print("✅ Inicialização concluída com sucesso!")
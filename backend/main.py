@@ -1,20 +1,88 @@
-from fastapi import FastAPI, HTTPException
+import time
+
+# Import time of this module (the app and every router), reported at startup
+_import_started = time.perf_counter()
+
+import logging
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
-from database import engine, Base
-from routers import commission, portfolio, settings, auth
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from database import async_engine, engine, describe_sqlite_settings, dispose_engines, get_db
+from migrations import pending_migrations
+from images import shutdown_pool
+import passwords
+from storage import UploadSizeLimitMiddleware
+from media import MediaFiles
+from config import settings as app_settings
+from routers import commission, portfolio, settings, auth, dashboard
+from pagination import NEXT_CURSOR_HEADER
+import metrics
+import query_log
 import os
 import uvicorn
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+_imports_seconds = time.perf_counter() - _import_started
+
+# Under uvicorn's server log, so the startup messages use its handler and format
+logger = logging.getLogger("uvicorn.error").getChild(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Per-process startup and shutdown.
+    
+    Schema changes are deployment work (python migrate.py), so startup only
+    creates the upload directories, warns about pending migrations and
+    records how long the process took to come up. Heavy dependencies
+    (passlib, python-jose, aiofiles, Pillow) load on first use instead.
+    """
+    started = time.perf_counter()
+    app_settings.create_upload_dirs()
+    # Sync engine reads: off the event loop, which a locked database would block
+    pending = await run_in_threadpool(pending_migrations, engine)
+    app.state.startup_seconds = {"imports": _imports_seconds, "startup": time.perf_counter() - started}
+    sqlite_settings = await run_in_threadpool(describe_sqlite_settings)
+    
+    logger.info("✅ Backend iniciado com sucesso!")
+    logger.info("📁 Diretórios de upload criados")
+    logger.info("🗄️ Banco de dados SQLite inicializado")
+    if pending:
+        logger.warning("⚠️ %d migração(ões) pendente(s): execute 'python migrate.py'", len(pending))
+    logger.info("⚙️ SQLite: %s", sqlite_settings)
+    logger.info(
+        "⏱️ Inicialização: imports %.0f ms, startup %.0f ms",
+        app.state.startup_seconds["imports"] * 1000, app.state.startup_seconds["startup"] * 1000
+    )
+    logger.info("🚀 API disponível em: http://localhost:8000")
+    logger.info("📚 Documentação disponível em: http://localhost:8000/docs")
+    yield
+    # Release pooled database connections and the image/password worker processes
+    await dispose_engines()
+    shutdown_pool()
+    passwords.shutdown_pool()
 
 # Create FastAPI app
 app = FastAPI(
     title="MINSK Art Backend API",
     description="Backend API para o site de arte da MINSK com SQLite e armazenamento local de imagens",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Reject oversized uploads from Content-Length before reading the body
+# (added before CORS so the 413 still carries CORS headers)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={
+        "/api/portfolio": app_settings.MAX_FILE_SIZE,
+        "/api/portfolio/batch": app_settings.MAX_BATCH_UPLOAD_SIZE,
+        "/api/settings/background-image": app_settings.MAX_BACKGROUND_SIZE,
+        "/api/settings/profile-image": app_settings.MAX_PROFILE_SIZE,
+    },
 )
 
 # CORS middleware - Allow frontend to access the API
@@ -30,19 +98,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Request counts and latency per route, SQL timings (outermost, so it times
+# the other middleware too); the slow-query log relies on the same per-request stats
+if app_settings.METRICS_ENABLED or app_settings.SLOW_QUERY_LOG:
+    app.add_middleware(metrics.MetricsMiddleware, routes=lambda: app.router.routes)
+    metrics.instrument_engine(engine, "sync")
+    if async_engine is not None:
+        metrics.instrument_engine(async_engine.sync_engine, "async")
+    metrics.register_gauge(
+        "password_pool_calls", "bcrypt calls in flight and the in-flight limit (workers + queue).",
+        ("state",), lambda: {
+            ("in_flight",): passwords.stats()["in_flight"],
+            ("limit",): app_settings.PASSWORD_WORKERS + app_settings.PASSWORD_QUEUE_LIMIT,
+        }
+    )
+    metrics.register_gauge(
+        "app_startup_seconds", "Time to import the app and to run its startup.",
+        ("phase",), lambda: {(phase,): seconds for phase, seconds in getattr(app.state, "startup_seconds", {}).items()}
+    )
+
+if app_settings.SLOW_QUERY_LOG:
+    query_log.install(engine, *([async_engine.sync_engine] if async_engine is not None else []))
+
 # Include API routers
 app.include_router(commission.router, prefix="/api")
 app.include_router(portfolio.router, prefix="/api")
 app.include_router(settings.router, prefix="/api")
 app.include_router(auth.router, prefix="/api")
+app.include_router(dashboard.router, prefix="/api")
 
-# Serve static files from uploads directory
-upload_dirs = ["uploads/portfolio", "uploads/profiles", "uploads/backgrounds"]
-for upload_dir in upload_dirs:
-    if os.path.isdir(upload_dir):
-        app.mount(f"/{upload_dir}", StaticFiles(directory=upload_dir), name=upload_dir.replace("/", "_"))
+# Serve uploaded media (resolved per request, so directories created at startup work too)
+app.mount("/uploads", MediaFiles(app_settings.UPLOAD_DIR), name="uploads")
 
 # Root endpoint
 @app.get("/")
@@ -55,22 +144,46 @@ def read_root():
             "commissions": "/api/commissions",
             "portfolio": "/api/portfolio", 
             "settings": "/api/settings",
-            "auth": "/api/auth"
+            "auth": "/api/auth",
+            "dashboard": "/api/dashboard/stats"
         }
     }
 
-# Health check endpoint
+# Health checks: liveness never touches the database or the disk
+@app.get("/health/live")
+def liveness():
+    return {"status": "alive"}
+
 @app.get("/health")
-def health_check():
-    return {
-        "status": "healthy",
-        "database": "connected",
-        "uploads": {
-            "portfolio": os.path.exists("uploads/portfolio"),
-            "profiles": os.path.exists("uploads/profiles"),
-            "backgrounds": os.path.exists("uploads/backgrounds")
+@app.get("/health/ready")
+async def readiness(db: AsyncSession = Depends(get_db)):
+    """Pings the database (with its latency) and checks the upload directories are writable; 503 when not ready."""
+    database = {"status": "connected"}
+    started = time.perf_counter()
+    try:
+        await db.execute(text("SELECT 1"))
+        database["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    except Exception as e:
+        database = {"status": "error", "detail": str(e)}
+    uploads = {directory: os.access(directory, os.W_OK) for directory in app_settings.upload_dirs()}
+    ready = database["status"] == "connected" and all(uploads.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "unavailable",
+            "database": database,
+            "uploads": {"writable": all(uploads.values()), "directories": uploads},
+            "startup_ms": {
+                phase: round(seconds * 1000, 1) for phase, seconds in getattr(app.state, "startup_seconds", {}).items()
+            },
         }
-    }
+    )
+
+# Prometheus scrape endpoint
+if app_settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 # Global exception handler
 @app.exception_handler(Exception)
@@ -83,22 +196,6 @@ async def global_exception_handler(request, exc):
         }
     )
 
-# Initialize default settings on startup
-@app.on_event("startup")
-async def startup_event():
-    """Initialize default settings and create upload directories on startup."""
-    
-    # Ensure upload directories exist
-    upload_dirs = ["uploads", "uploads/portfolio", "uploads/profiles", "uploads/backgrounds"]
-    for directory in upload_dirs:
-        os.makedirs(directory, exist_ok=True)
-    
-    print("✅ Backend iniciado com sucesso!")
-    print("📁 Diretórios de upload criados")
-    print("🗄️ Banco de dados SQLite inicializado")
-    print("🚀 API disponível em: http://localhost:8000")
-    print("📚 Documentação disponível em: http://localhost:8000/docs")
-
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -0,0 +1,215 @@
+"""
+Media serving for /uploads.
+
+A leaner replacement for StaticFiles tuned for user uploads:
+
+- Files resolve at request time, so the mount works even when the upload
+  directories are created after import (in the startup event).
+- Content-addressed blobs and uuid-named legacy uploads never change, so
+  they are sent with ``Cache-Control: public, max-age=31536000, immutable``
+  and a strong ETag; conditional requests get 304.
+- Single byte ranges (``Range: bytes=…``, honouring ``If-Range``) get 206,
+  so large backgrounds can be resumed or seeked.
+- A precompressed sibling (``file.svg.br`` / ``file.svg.gz``) is served
+  with Content-Encoding when the client accepts it.
+- The body goes out through the ASGI ``http.response.zerocopysend``
+  extension (sendfile) when the server offers it, and in chunks read off
+  the event loop otherwise.
+"""
+
+import mimetypes
+import os
+import re
+import stat
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional, Tuple
+import anyio
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.types import Receive, Scope, Send
+from http_cache import is_not_modified
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"
+CHUNK_SIZE = 256 * 1024
+
+# A sha256 (blob store) or uuid4 (legacy uploads) in the name means the content never changes
+UNIQUE_NAME = re.compile(
+    r"[0-9a-f]{64}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+)
+BLOB_NAME = re.compile(r"^[0-9a-f]{64}")
+
+# Preferred first
+PRECOMPRESSED = [("br", ".br"), ("gzip", ".gz")]
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    First and last byte (inclusive) of a single ``bytes=`` range.
+
+    Returns None for anything we do not serve partially (other units,
+    multiple ranges, malformed values): the full file is sent instead.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    for entry in accept_encoding.split(","):
+        name, _, params = entry.strip().partition(";")
+        if name.strip().lower() == coding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+class MediaFiles:
+    """ASGI app serving the files under `directory` (GET/HEAD only)."""
+
+    def __init__(self, directory: str):
+        self.root = os.path.realpath(directory)
+
+    def resolve(self, path: str) -> Optional[str]:
+        parts = [part for part in path.split("/") if part]
+        # Rejects "..", dotfiles and the in-progress ".<uuid>.part" uploads
+        if not parts or any(part.startswith(".") or "\\" in part for part in parts):
+            return None
+        full_path = os.path.realpath(os.path.join(self.root, *parts))
+        if os.path.commonpath([full_path, self.root]) != self.root:
+            return None
+        return full_path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        assert scope["type"] == "http"
+        if scope["method"] not in ("GET", "HEAD"):
+            await PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})(
+                scope, receive, send
+            )
+            return
+
+        request = Request(scope)
+        full_path = self.resolve(scope["path"])
+        stat_result = await anyio.to_thread.run_sync(self._stat, full_path) if full_path else None
+        if stat_result is None:
+            await PlainTextResponse("Not Found", status_code=404)(scope, receive, send)
+            return
+
+        name = os.path.basename(full_path)
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        send_path, size, encoding = full_path, stat_result.st_size, None
+        has_siblings = False
+        accept_encoding = request.headers.get("accept-encoding", "")
+        for coding, suffix in PRECOMPRESSED:
+            sibling = await anyio.to_thread.run_sync(self._stat, full_path + suffix)
+            if sibling is None:
+                continue
+            has_siblings = True
+            if encoding is None and _accepts(accept_encoding, coding):
+                send_path, size, encoding = full_path + suffix, sibling.st_size, coding
+
+        etag = self._etag(name, stat_result, encoding)
+        last_modified = datetime.fromtimestamp(stat_result.st_mtime, timezone.utc)
+        headers = {
+            "content-type": content_type,
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": format_datetime(last_modified.replace(microsecond=0), usegmt=True),
+            "cache-control": IMMUTABLE if UNIQUE_NAME.search(name) else REVALIDATE,
+            "x-content-type-options": "nosniff",
+        }
+        if encoding:
+            headers["content-encoding"] = encoding
+        if has_siblings:
+            headers["vary"] = "Accept-Encoding"
+
+        if is_not_modified(request, etag, last_modified):
+            headers.pop("content-type")
+            await self._send(send, 304, headers)
+            return
+
+        status_code, offset, count = 200, 0, size
+        range_header = request.headers.get("range")
+        if range_header and self._if_range_matches(request, etag, headers["last-modified"]):
+            try:
+                byte_range = parse_range(range_header, size)
+            except RangeNotSatisfiable:
+                await self._send(send, 416, {"content-range": f"bytes */{size}", "content-length": "0"})
+                return
+            if byte_range is not None:
+                first, last = byte_range
+                status_code, offset, count = 206, first, last - first + 1
+                headers["content-range"] = f"bytes {first}-{last}/{size}"
+
+        headers["content-length"] = str(count)
+        if scope["method"] == "HEAD":
+            await self._send(send, status_code, headers)
+            return
+        await self._send(send, status_code, headers, more_body=True)
+        await self._send_file(scope, send, send_path, offset, count)
+
+    @staticmethod
+    def _stat(path: str) -> Optional[os.stat_result]:
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            return None
+        return stat_result if stat.S_ISREG(stat_result.st_mode) else None
+
+    @staticmethod
+    def _etag(name: str, stat_result: os.stat_result, encoding: Optional[str]) -> str:
+        # Blob names (the original and its "-thumb"/"-medium"… derivatives) identify the content
+        tag = name if BLOB_NAME.match(name) else f"{int(stat_result.st_mtime):x}-{stat_result.st_size:x}"
+        return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+    @staticmethod
+    def _if_range_matches(request: Request, etag: str, last_modified: str) -> bool:
+        if_range = request.headers.get("if-range")
+        return if_range is None or if_range.strip() in (etag, last_modified)
+
+    @staticmethod
+    async def _send(send: Send, status_code: int, headers: dict, more_body: bool = False) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(key.encode("latin-1"), value.encode("latin-1")) for key, value in headers.items()],
+        })
+        if not more_body:
+            await send({"type": "http.response.body", "body": b""})
+
+    @staticmethod
+    async def _send_file(scope: Scope, send: Send, path: str, offset: int, count: int) -> None:
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": offset,
+                    "count": count,
+                })
+            return
+        async with await anyio.open_file(path, "rb") as file:
+            await file.seek(offset)
+            remaining = count
+            while True:
+                chunk = await file.read(min(CHUNK_SIZE, remaining)) if remaining else b""
+                remaining -= len(chunk)
+                # An empty read ends the body too, should the file shrink under us
+                more_body = bool(chunk) and remaining > 0
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                if not more_body:
+                    break
@@ -0,0 +1,264 @@
+"""
+In-process metrics in the Prometheus text format, served at /metrics.
+
+No client library or collector is needed: counters, gauges and histograms
+live in this module and are rendered on scrape. They cover
+
+- HTTP requests per route template (count, latency histogram, in flight),
+- SQL statements (latency histogram by verb, statements and DB time per
+  request, connection pool use), timed with the engine cursor events,
+- threadpool saturation, the password worker pool and uploaded bytes.
+
+Values are per process: with several uvicorn workers each one reports its
+own, so scrape them individually (or run a single worker).
+"""
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import anyio.to_thread
+from sqlalchemy import event
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Starlette appends "; charset=utf-8" to text/ media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+# Statement label: the leading SQL keyword, one of these or "OTHER"
+STATEMENT_VERBS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA", "BEGIN", "COMMIT", "ROLLBACK"}
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound}"' if bound == "+Inf" else f'le="{_number(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time until the response body was sent.", ("method", "route")
+)
+IN_PROGRESS = Gauge("http_requests_in_progress", "Requests being handled.", ("method", "route"))
+QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time by leading keyword.", ("statement",), QUERY_BUCKETS
+)
+QUERY_ERRORS = Counter("db_query_errors_total", "SQL statements that raised.", ("statement",))
+QUERIES_PER_REQUEST = Histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ("method", "route"), COUNT_BUCKETS
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request.", ("method", "route")
+)
+UPLOADS = Counter("uploads_total", "Files stored in the upload blob store.")
+UPLOAD_BYTES = Counter("upload_bytes_total", "Bytes stored in the upload blob store.")
+
+METRICS: List[Metric] = [
+    REQUESTS, REQUEST_LATENCY, IN_PROGRESS, QUERY_LATENCY, QUERY_ERRORS,
+    QUERIES_PER_REQUEST, DB_TIME_PER_REQUEST, UPLOADS, UPLOAD_BYTES,
+]
+
+# Gauges computed on scrape: name -> (help, callable returning {labels tuple: value})
+_collectors: Dict[str, Tuple[str, Tuple[str, ...], Callable[[], Dict[tuple, float]]]] = {}
+
+def register_gauge(name: str, documentation: str, labelnames: Sequence[str], collect: Callable[[], Dict[tuple, float]]) -> None:
+    """Add a gauge whose values are read by `collect` at scrape time."""
+    _collectors[name] = (documentation, tuple(labelnames), collect)
+
+def _threadpool_gauges() -> Dict[tuple, float]:
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {
+        ("total",): limiter.total_tokens,
+        ("in_use",): limiter.borrowed_tokens,
+        ("waiting",): limiter.statistics().tasks_waiting,
+    }
+
+register_gauge(
+    "threadpool_threads", "Default threadpool capacity, threads in use and tasks waiting for one.",
+    ("state",), _threadpool_gauges
+)
+
+def render() -> str:
+    """The exposition text. Call from the event loop (the threadpool limiter is read there)."""
+    lines = []
+    for metric in METRICS:
+        lines += metric.header() + metric.render()
+    for name, (documentation, labelnames, collect) in _collectors.items():
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+        lines += [f"{name}{_labels(labelnames, key)} {_number(value)}" for key, value in sorted(collect().items())]
+    return "\n".join(lines) + "\n"
+
+class RequestStats:
+    __slots__ = ("method", "route", "queries", "db_seconds", "statements")
+
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.queries = 0
+        self.db_seconds = 0.0
+        # statement text -> executions, to spot statements repeated per row
+        self.statements: Dict[str, int] = {}
+
+# Statements of the current request; the object is shared with the threadpool
+# and SQLAlchemy greenlets, which run with a copy of the request context
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+# Called with the RequestStats of every finished request (see query_log.py)
+request_hooks: List[Callable[[RequestStats], None]] = []
+
+def _statement_label(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return verb if verb in STATEMENT_VERBS else "OTHER"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    QUERY_LATENCY.observe(elapsed, _statement_label(statement))
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+def _handle_error(exception_context):
+    if exception_context.statement:
+        QUERY_ERRORS.inc(_statement_label(exception_context.statement))
+
+def instrument_engine(engine, name: str) -> None:
+    """Time the statements of a (sync) engine and report its connection pool."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    pool = engine.pool
+    if hasattr(pool, "checkedout"):
+        register_gauge(
+            f"db_pool_connections_{name}", f"Connections of the {name} engine pool, checked out and idle.",
+            ("state",), lambda: {("checked_out",): pool.checkedout(), ("idle",): pool.checkedin()}
+        )
+
+class MetricsMiddleware:
+    """Count and time every request under its route template (e.g. /api/portfolio/{item_id})."""
+
+    def __init__(self, app: ASGIApp, routes: Callable[[], list]):
+        self.app = app
+        # Resolved lazily: the routes are registered after the middleware is added
+        self.routes = routes
+
+    def route_template(self, scope: Scope) -> str:
+        partial = None
+        for route in self.routes():
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+            if match == Match.PARTIAL and partial is None:
+                # Path matches but not the method (405), unless a later route takes it
+                partial = route.path
+        # Unknown paths share one label so they cannot grow the series
+        return partial or "unmatched"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method, route = scope["method"], self.route_template(scope)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats(method, route)
+        token = current_request.set(stats)
+        IN_PROGRESS.inc(method, route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.observe(time.perf_counter() - started, method, route)
+            IN_PROGRESS.dec(method, route)
+            REQUESTS.inc(method, route, str(status_code))
+            QUERIES_PER_REQUEST.observe(stats.queries, method, route)
+            DB_TIME_PER_REQUEST.observe(stats.db_seconds, method, route)
+            current_request.reset(token)
+            for hook in request_hooks:
+                hook(stats)
@@ -0,0 +1,92 @@
+"""
+Aplica as migrações do banco de dados (execute no deploy, não no import da app).
+
+    python migrate.py            # aplica as migrações pendentes
+    python migrate.py --status   # lista migrações aplicadas/pendentes
+    python migrate.py --check    # confere os planos de consulta (EXPLAIN QUERY PLAN)
+    python migrate.py --rebuild-search  # reconstrói os índices de busca (após um VACUUM)
+"""
+
+import argparse
+import sys
+from sqlalchemy import create_engine, select
+from database import engine
+from migrations import apply_migrations, discover_migrations, pending_migrations
+from models import CommissionRequest, PortfolioItem
+from pagination import encode_cursor, keyset_page
+from search import SEARCH_TABLES
+
+def query_plan_checks():
+    """(label, statement, expected index) for the hot queries of the routers."""
+    cursor = encode_cursor("2024-01-01 00:00:00", "00000000-0000-0000-0000-000000000000")
+    commissions = select(CommissionRequest)
+    portfolio = select(PortfolioItem)
+    return [
+        ("read_commissions",
+         keyset_page(commissions, CommissionRequest, None, 100),
+         "ix_commissions_created_at_id"),
+        ("read_commissions (after)",
+         keyset_page(commissions, CommissionRequest, cursor, 100),
+         "ix_commissions_created_at_id"),
+        ("read_commissions (status_filter, after)",
+         keyset_page(commissions.where(CommissionRequest.status == "pending"), CommissionRequest, cursor, 100),
+         "ix_commissions_status_created_at_id"),
+        ("read_portfolio_items",
+         keyset_page(portfolio, PortfolioItem, None, 100),
+         "ix_portfolio_items_created_at_id"),
+        ("read_portfolio_items (category, after)",
+         keyset_page(portfolio.where(PortfolioItem.category == "Chibi"), PortfolioItem, cursor, 100),
+         "ix_portfolio_items_category_created_at_id"),
+        ("read_portfolio_items (featured_only, after)",
+         keyset_page(portfolio.where(PortfolioItem.is_featured == True), PortfolioItem, cursor, 100),
+         "ix_portfolio_items_featured_created_at_id"),
+    ]
+
+def check_query_plans() -> bool:
+    """Apply all migrations to a scratch database and assert the planner uses the indexes."""
+    scratch = create_engine("sqlite://")
+    apply_migrations(scratch, log=lambda message: None)
+    ok = True
+    with scratch.connect() as conn:
+        for label, statement, index in query_plan_checks():
+            sql = str(statement.compile(dialect=scratch.dialect, compile_kwargs={"literal_binds": True}))
+            plan = [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+            uses_index = any(f"INDEX {index}" in detail for detail in plan)
+            sorts = any("TEMP B-TREE FOR ORDER BY" in detail for detail in plan)
+            passed = uses_index and not sorts
+            ok = ok and passed
+            print(f"{'✅' if passed else '❌'} {label}: {' | '.join(plan)}")
+    return ok
+
+def rebuild_search_indexes() -> None:
+    """Rebuild the FTS5 indexes from their tables (their rowids may change on VACUUM)."""
+    with engine.begin() as conn:
+        for name in SEARCH_TABLES:
+            conn.exec_driver_sql(f"INSERT INTO {name} ({name}) VALUES ('rebuild')")
+            print(f"✅ {name} reconstruído")
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrações do banco de dados")
+    parser.add_argument("--status", action="store_true", help="listar migrações aplicadas/pendentes")
+    parser.add_argument("--check", action="store_true", help="verificar o uso dos índices nos planos de consulta")
+    parser.add_argument("--rebuild-search", action="store_true", help="reconstruir os índices de busca (FTS5)")
+    args = parser.parse_args()
+
+    if args.rebuild_search:
+        rebuild_search_indexes()
+        return
+
+    if args.check:
+        sys.exit(0 if check_query_plans() else 1)
+
+    if args.status:
+        pending = {migration.version for migration in pending_migrations(engine)}
+        for migration in discover_migrations():
+            print(f"{'⏳ pendente' if migration.version in pending else '✅ aplicada '}  {migration.name}")
+        return
+
+    applied = apply_migrations(engine)
+    print(f"✅ {len(applied)} migração(ões) aplicada(s)" if applied else "✅ Banco de dados já está atualizado")
+
+if __name__ == "__main__":
+    main()
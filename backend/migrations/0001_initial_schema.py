@@ -0,0 +1,77 @@
+"""Initial schema, as previously created by Base.metadata.create_all."""
+
+# IF NOT EXISTS lets databases created before migrations existed adopt this
+# version without changes.
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS commissions (
+        id VARCHAR NOT NULL,
+        full_name VARCHAR NOT NULL,
+        discord_id VARCHAR NOT NULL,
+        email VARCHAR NOT NULL,
+        project_description TEXT NOT NULL,
+        status VARCHAR,
+        payment_status VARCHAR,
+        progress_status VARCHAR,
+        file_reference VARCHAR,
+        notes TEXT,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+        updated_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+        PRIMARY KEY (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_commissions_id ON commissions (id)",
+    """
+    CREATE TABLE IF NOT EXISTS portfolio_categories (
+        id VARCHAR NOT NULL,
+        name VARCHAR NOT NULL,
+        description TEXT,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+        PRIMARY KEY (id),
+        UNIQUE (name)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_portfolio_categories_id ON portfolio_categories (id)",
+    """
+    CREATE TABLE IF NOT EXISTS portfolio_items (
+        id VARCHAR NOT NULL,
+        title VARCHAR NOT NULL,
+        description TEXT,
+        category VARCHAR NOT NULL,
+        image_url VARCHAR NOT NULL,
+        is_featured BOOLEAN,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+        updated_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+        PRIMARY KEY (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_portfolio_items_id ON portfolio_items (id)",
+    """
+    CREATE TABLE IF NOT EXISTS site_settings (
+        id INTEGER NOT NULL,
+        "key" VARCHAR NOT NULL,
+        value TEXT NOT NULL,
+        description TEXT,
+        updated_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+        PRIMARY KEY (id),
+        UNIQUE ("key")
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_site_settings_id ON site_settings (id)",
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id VARCHAR NOT NULL,
+        email VARCHAR NOT NULL,
+        hashed_password VARCHAR NOT NULL,
+        display_name VARCHAR,
+        role VARCHAR,
+        avatar_url VARCHAR,
+        is_active BOOLEAN,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+        updated_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+        PRIMARY KEY (id),
+        UNIQUE (email)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_users_id ON users (id)",
+]
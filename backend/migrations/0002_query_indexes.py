@@ -0,0 +1,13 @@
+"""Composite indexes matching the listing filters, keyset order and stats counts."""
+
+STATEMENTS = [
+    # read_commissions: newest first, optionally filtered by status
+    "CREATE INDEX IF NOT EXISTS ix_commissions_created_at_id ON commissions (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_commissions_status_created_at_id ON commissions (status, created_at, id)",
+    # stats/summary: in-progress count
+    "CREATE INDEX IF NOT EXISTS ix_commissions_progress_status ON commissions (progress_status)",
+    # read_portfolio_items: newest first, optionally by category and/or featured
+    "CREATE INDEX IF NOT EXISTS ix_portfolio_items_created_at_id ON portfolio_items (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_portfolio_items_category_created_at_id ON portfolio_items (category, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_portfolio_items_featured_created_at_id ON portfolio_items (is_featured, created_at, id)",
+]
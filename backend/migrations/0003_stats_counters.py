@@ -0,0 +1,97 @@
+"""Row counters for the dashboard, maintained by triggers in the writing transaction."""
+
+def bump(name: str, delta: str) -> str:
+    return (
+        f"INSERT INTO stats_counters (name, value) VALUES ({name}, {delta}) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;"
+    )
+
+def trigger(name: str, event: str, table: str, body: list, when: str = None) -> str:
+    condition = f" WHEN {when}" if when else ""
+    return f"CREATE TRIGGER {name} AFTER {event} ON {table}{condition} BEGIN {' '.join(body)} END"
+
+def status(row: str) -> str:
+    return f"'commissions:status:' || coalesce({row}.status, '')"
+
+def progress(row: str) -> str:
+    return f"'commissions:progress:' || coalesce({row}.progress_status, '')"
+
+def category(row: str) -> str:
+    return f"'portfolio:category:' || {row}.category"
+
+def featured(row: str) -> str:
+    return f"CASE WHEN {row}.is_featured THEN 1 ELSE 0 END"
+
+STATEMENTS = [
+    """
+    CREATE TABLE stats_counters (
+        name VARCHAR NOT NULL,
+        value INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (name)
+    )
+    """,
+    trigger("trg_commissions_count_insert", "INSERT", "commissions", [
+        bump("'commissions:total'", "1"),
+        bump(status("NEW"), "1"),
+        bump(progress("NEW"), "1"),
+    ]),
+    trigger("trg_commissions_count_delete", "DELETE", "commissions", [
+        bump("'commissions:total'", "-1"),
+        bump(status("OLD"), "-1"),
+        bump(progress("OLD"), "-1"),
+    ]),
+    trigger("trg_commissions_count_status", "UPDATE OF status", "commissions", [
+        bump(status("OLD"), "-1"),
+        bump(status("NEW"), "1"),
+    ], when="OLD.status IS NOT NEW.status"),
+    trigger("trg_commissions_count_progress", "UPDATE OF progress_status", "commissions", [
+        bump(progress("OLD"), "-1"),
+        bump(progress("NEW"), "1"),
+    ], when="OLD.progress_status IS NOT NEW.progress_status"),
+    trigger("trg_portfolio_count_insert", "INSERT", "portfolio_items", [
+        bump("'portfolio:total'", "1"),
+        bump("'portfolio:featured'", featured("NEW")),
+        bump(category("NEW"), "1"),
+    ]),
+    trigger("trg_portfolio_count_delete", "DELETE", "portfolio_items", [
+        bump("'portfolio:total'", "-1"),
+        bump("'portfolio:featured'", f"-{featured('OLD')}"),
+        bump(category("OLD"), "-1"),
+    ]),
+    trigger("trg_portfolio_count_featured", "UPDATE OF is_featured", "portfolio_items", [
+        bump("'portfolio:featured'", f"{featured('NEW')} - {featured('OLD')}"),
+    ], when="OLD.is_featured IS NOT NEW.is_featured"),
+    trigger("trg_portfolio_count_category", "UPDATE OF category", "portfolio_items", [
+        bump(category("OLD"), "-1"),
+        bump(category("NEW"), "1"),
+    ], when="OLD.category IS NOT NEW.category"),
+]
+
+def upgrade(conn):
+    for statement in STATEMENTS:
+        conn.exec_driver_sql(statement)
+
+    # Backfill from one grouped query per table
+    counters = {}
+
+    def add(name, value):
+        counters[name] = counters.get(name, 0) + value
+
+    rows = conn.exec_driver_sql(
+        "SELECT status, progress_status, count(*) FROM commissions GROUP BY status, progress_status"
+    )
+    for status_value, progress_value, count in rows:
+        add("commissions:total", count)
+        add(f"commissions:status:{status_value or ''}", count)
+        add(f"commissions:progress:{progress_value or ''}", count)
+
+    rows = conn.exec_driver_sql(
+        "SELECT category, is_featured, count(*) FROM portfolio_items GROUP BY category, is_featured"
+    )
+    for category_value, is_featured, count in rows:
+        add("portfolio:total", count)
+        add("portfolio:featured", count if is_featured else 0)
+        add(f"portfolio:category:{category_value}", count)
+
+    for name, value in counters.items():
+        conn.exec_driver_sql("INSERT INTO stats_counters (name, value) VALUES (?, ?)", (name, value))
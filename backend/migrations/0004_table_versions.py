@@ -0,0 +1,23 @@
+"""Per-table version counters (and last write time) for HTTP conditional GETs."""
+
+TABLES = ["commissions", "portfolio_items", "portfolio_categories", "site_settings"]
+
+STATEMENTS = [
+    """
+    CREATE TABLE table_versions (
+        name VARCHAR NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0,
+        modified_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+        PRIMARY KEY (name)
+    )
+    """,
+]
+
+for table in TABLES:
+    STATEMENTS.append(f"INSERT INTO table_versions (name, version) VALUES ('{table}', 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        STATEMENTS.append(
+            f"CREATE TRIGGER trg_{table}_version_{event.lower()} AFTER {event} ON {table} BEGIN "
+            f"UPDATE table_versions SET version = version + 1, modified_at = CURRENT_TIMESTAMP "
+            f"WHERE name = '{table}'; END"
+        )
@@ -0,0 +1,5 @@
+"""Resized derivatives available for each portfolio image (NULL = not generated yet)."""
+
+STATEMENTS = [
+    "ALTER TABLE portfolio_items ADD COLUMN image_variants JSON",
+]
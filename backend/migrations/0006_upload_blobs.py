@@ -0,0 +1,53 @@
+"""Reference counts of content-addressed upload blobs, maintained by triggers."""
+
+BLOB_URL = "'/uploads/blobs/%'"
+
+def acquire(url: str) -> str:
+    return (
+        f"INSERT INTO upload_blobs (url, ref_count) VALUES ({url}, 1) "
+        "ON CONFLICT(url) DO UPDATE SET ref_count = ref_count + 1;"
+    )
+
+def release(url: str) -> str:
+    # The row disappears with its last reference; the file is removed after commit
+    return (
+        f"UPDATE upload_blobs SET ref_count = ref_count - 1 WHERE url = {url}; "
+        f"DELETE FROM upload_blobs WHERE url = {url} AND ref_count <= 0;"
+    )
+
+def trigger(name: str, event: str, table: str, body: list, when: str) -> str:
+    return f"CREATE TRIGGER {name} AFTER {event} ON {table} WHEN {when} BEGIN {' '.join(body)} END"
+
+def reference_triggers(prefix: str, table: str, column: str) -> list:
+    new, old = f"NEW.{column}", f"OLD.{column}"
+    return [
+        trigger(f"trg_{prefix}_blob_insert", "INSERT", table, [acquire(new)],
+                when=f"{new} LIKE {BLOB_URL}"),
+        trigger(f"trg_{prefix}_blob_delete", "DELETE", table, [release(old)],
+                when=f"{old} LIKE {BLOB_URL}"),
+        trigger(f"trg_{prefix}_blob_acquire", f"UPDATE OF {column}", table, [acquire(new)],
+                when=f"{new} LIKE {BLOB_URL} AND {old} IS NOT {new}"),
+        trigger(f"trg_{prefix}_blob_release", f"UPDATE OF {column}", table, [release(old)],
+                when=f"{old} LIKE {BLOB_URL} AND {old} IS NOT {new}"),
+    ]
+
+STATEMENTS = [
+    """
+    CREATE TABLE upload_blobs (
+        url VARCHAR NOT NULL,
+        ref_count INTEGER NOT NULL DEFAULT 0,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+        PRIMARY KEY (url)
+    )
+    """,
+    *reference_triggers("portfolio", "portfolio_items", "image_url"),
+    *reference_triggers("settings", "site_settings", "value"),
+    f"""
+    INSERT INTO upload_blobs (url, ref_count)
+    SELECT url, count(*) FROM (
+        SELECT image_url AS url FROM portfolio_items WHERE image_url LIKE {BLOB_URL}
+        UNION ALL
+        SELECT value AS url FROM site_settings WHERE value LIKE {BLOB_URL}
+    ) GROUP BY url
+    """,
+]
@@ -0,0 +1,32 @@
+"""Full-text index of the portfolio (FTS5, external content), maintained by triggers."""
+
+COLUMNS = ["title", "description", "category"]
+
+def values(row: str) -> str:
+    return ", ".join(f"{row}.{column}" for column in COLUMNS)
+
+INSERT = f"INSERT INTO portfolio_search (rowid, {', '.join(COLUMNS)}) VALUES (NEW.rowid, {values('NEW')});"
+# External content tables are told what to remove with the old values
+DELETE = (
+    f"INSERT INTO portfolio_search (portfolio_search, rowid, {', '.join(COLUMNS)}) "
+    f"VALUES ('delete', OLD.rowid, {values('OLD')});"
+)
+
+STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE portfolio_search USING fts5(
+        {', '.join(COLUMNS)},
+        content='portfolio_items',
+        content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    # bm25 column weights used by ORDER BY rank: title, description, category
+    "INSERT INTO portfolio_search (portfolio_search, rank) VALUES ('rank', 'bm25(10.0, 1.0, 4.0)')",
+    f"CREATE TRIGGER trg_portfolio_search_insert AFTER INSERT ON portfolio_items BEGIN {INSERT} END",
+    f"CREATE TRIGGER trg_portfolio_search_delete AFTER DELETE ON portfolio_items BEGIN {DELETE} END",
+    f"CREATE TRIGGER trg_portfolio_search_update AFTER UPDATE OF {', '.join(COLUMNS)} ON portfolio_items "
+    f"BEGIN {DELETE} {INSERT} END",
+    "INSERT INTO portfolio_search (portfolio_search) VALUES ('rebuild')",
+]
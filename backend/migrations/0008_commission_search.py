@@ -0,0 +1,33 @@
+"""Full-text index of commission requests (FTS5, external content), maintained by triggers."""
+
+COLUMNS = ["full_name", "discord_id", "email", "project_description", "notes"]
+
+def values(row: str) -> str:
+    return ", ".join(f"{row}.{column}" for column in COLUMNS)
+
+INSERT = f"INSERT INTO commission_search (rowid, {', '.join(COLUMNS)}) VALUES (NEW.rowid, {values('NEW')});"
+# External content tables are told what to remove with the old values
+DELETE = (
+    f"INSERT INTO commission_search (commission_search, rowid, {', '.join(COLUMNS)}) "
+    f"VALUES ('delete', OLD.rowid, {values('OLD')});"
+)
+
+STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE commission_search USING fts5(
+        {', '.join(COLUMNS)},
+        content='commissions',
+        content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    # bm25 column weights used by ORDER BY rank: client identity first, then the texts
+    "INSERT INTO commission_search (commission_search, rank) VALUES ('rank', 'bm25(10.0, 10.0, 10.0, 1.0, 2.0)')",
+    f"CREATE TRIGGER trg_commission_search_insert AFTER INSERT ON commissions BEGIN {INSERT} END",
+    f"CREATE TRIGGER trg_commission_search_delete AFTER DELETE ON commissions BEGIN {DELETE} END",
+    # Status/payment/progress updates leave the index alone
+    f"CREATE TRIGGER trg_commission_search_update AFTER UPDATE OF {', '.join(COLUMNS)} ON commissions "
+    f"BEGIN {DELETE} {INSERT} END",
+    "INSERT INTO commission_search (commission_search) VALUES ('rebuild')",
+]
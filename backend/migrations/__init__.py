@@ -0,0 +1,84 @@
+"""
+Versioned schema migrations.
+
+Every module in this package named ``NNNN_description.py`` is one migration.
+Migrations are applied in version order, each in its own transaction, and
+recorded in the ``schema_migrations`` table. A migration either lists raw SQL
+in ``STATEMENTS`` or defines ``upgrade(conn)`` for anything more involved.
+
+Apply them at deploy time with ``python migrate.py``.
+"""
+
+import importlib
+import pkgutil
+import re
+from typing import Callable, List, NamedTuple
+from sqlalchemy import inspect
+
+MIGRATION_NAME = re.compile(r"^(\d{4})_\w+$")
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    module: object
+
+def discover_migrations() -> List[Migration]:
+    """List all migrations in this package, ordered by version."""
+    migrations = []
+    for info in pkgutil.iter_modules(__path__):
+        match = MIGRATION_NAME.match(info.name)
+        if match:
+            module = importlib.import_module(f"{__name__}.{info.name}")
+            migrations.append(Migration(int(match.group(1)), info.name, module))
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Duplicate migration version numbers")
+    return migrations
+
+def applied_versions(conn) -> set:
+    """Versions already recorded in schema_migrations."""
+    if not inspect(conn).has_table("schema_migrations"):
+        return set()
+    return {row[0] for row in conn.exec_driver_sql("SELECT version FROM schema_migrations")}
+
+def pending_migrations(engine) -> List[Migration]:
+    """Migrations not yet applied to the database behind `engine`."""
+    with engine.connect() as conn:
+        applied = applied_versions(conn)
+    return [migration for migration in discover_migrations() if migration.version not in applied]
+
+def apply_migrations(engine, log: Callable[[str], None] = print) -> List[Migration]:
+    """Apply pending migrations in order and return the ones applied."""
+    applied = []
+    # Transactions are managed by hand: pysqlite would otherwise run DDL
+    # outside of any transaction, leaving half-applied migrations on error.
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        conn.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+            "applied_at DATETIME DEFAULT (CURRENT_TIMESTAMP))"
+        )
+        done = applied_versions(conn)
+        for migration in discover_migrations():
+            if migration.version in done:
+                continue
+            log(f"Applying migration {migration.name}")
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                if hasattr(migration.module, "upgrade"):
+                    migration.module.upgrade(conn)
+                else:
+                    for statement in migration.module.STATEMENTS:
+                        conn.exec_driver_sql(statement)
+                conn.exec_driver_sql(
+                    "INSERT INTO schema_migrations (version, name) VALUES (?, ?)",
+                    (migration.version, migration.name),
+                )
+                conn.exec_driver_sql("COMMIT")
+            except Exception:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+            applied.append(migration)
+    return applied
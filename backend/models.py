@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, Integer, Boolean
+from sqlalchemy import Column, String, DateTime, Text, Integer, Boolean, Index, JSON
 from sqlalchemy.sql import func
 from database import Base
 import uuid
@@ -18,6 +18,13 @@ class CommissionRequest(Base):
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    
+    # Created by migrations/0002_query_indexes.py
+    __table_args__ = (
+        Index("ix_commissions_created_at_id", "created_at", "id"),
+        Index("ix_commissions_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_commissions_progress_status", "progress_status"),
+    )
 
 class PortfolioItem(Base):
     __tablename__ = "portfolio_items"
@@ -27,9 +34,17 @@ class PortfolioItem(Base):
     description = Column(Text, nullable=True)
     category = Column(String, nullable=False)
     image_url = Column(String, nullable=False)  # store relative path to the local file
+    image_variants = Column(JSON, nullable=True)  # {size: {url, width, height}}, see images.py
     is_featured = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    
+    # Created by migrations/0002_query_indexes.py
+    __table_args__ = (
+        Index("ix_portfolio_items_created_at_id", "created_at", "id"),
+        Index("ix_portfolio_items_category_created_at_id", "category", "created_at", "id"),
+        Index("ix_portfolio_items_featured_created_at_id", "is_featured", "created_at", "id"),
+    )
 
 class SiteSetting(Base):
     __tablename__ = "site_settings"
@@ -60,3 +75,26 @@ class PortfolioCategory(Base):
     name = Column(String, unique=True, nullable=False)
     description = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class StatsCounter(Base):
+    __tablename__ = "stats_counters"
+    
+    # Maintained by triggers, see migrations/0003_stats_counters.py
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+    
+    # Bumped by triggers on every write, see migrations/0004_table_versions.py
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    modified_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class UploadBlob(Base):
+    __tablename__ = "upload_blobs"
+    
+    # Reference counts maintained by triggers, see migrations/0006_upload_blobs.py
+    url = Column(String, primary_key=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,81 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Listings are ordered newest first by (created_at, id). A cursor is the opaque,
+url-safe encoding of the last row's key, so the next page is an index range
+scan starting right after it, whose cost does not depend on the page depth.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import String, tuple_, type_coerce
+
+# Response header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(*key) -> str:
+    """Encode a row key as an opaque cursor token."""
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str) -> list:
+    """Decode a cursor token produced by encode_cursor."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(key, list):
+            raise ValueError
+        return key
+    except (ValueError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+def is_timestamp(value: str) -> bool:
+    """Whether a cursor's created_at looks like the ISO text SQLite stores."""
+    try:
+        datetime.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+def keyset_page(query, model, after: Optional[str], limit: int):
+    """
+    Order `query` newest first and restrict it to the page after `after`.
+
+    created_at is compared as the raw text SQLite stores, so the cursor key
+    matches stored values exactly (and the comparison stays index friendly).
+    One extra row is fetched to know whether another page exists.
+    """
+    created_at = type_coerce(model.created_at, String)
+    query = query.add_columns(created_at.label("cursor_created_at"))
+    if after:
+        key = decode_cursor(after)
+        if len(key) != 2 or not all(isinstance(part, str) for part in key) or not is_timestamp(key[0]):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid pagination cursor"
+            )
+        query = query.where(tuple_(created_at, model.id) < tuple(key))
+    return query.order_by(created_at.desc(), model.id.desc()).limit(limit + 1)
+
+def split_page(rows, limit: int) -> Tuple[List, Optional[str]]:
+    """Split rows fetched by keyset_page into (items, next_cursor)."""
+    items = [row[0] for row in rows[:limit]]
+    if len(rows) <= limit:
+        return items, None
+    last = rows[limit - 1]
+    return items, encode_cursor(last[-1], last[0].id)
+
+def split_rows(rows, limit: int) -> Tuple[List, Optional[str]]:
+    """split_page for column selects (id first), whose rows are kept as tuples."""
+    page = rows[:limit]
+    if len(rows) <= limit:
+        return page, None
+    last = rows[limit - 1]
+    return page, encode_cursor(last[-1], last[0])
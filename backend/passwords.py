@@ -0,0 +1,98 @@
+"""
+Password hashing off the request path.
+
+bcrypt is deliberately slow (~250 ms per call at the default cost), so hashing
+and verification run in a small dedicated process pool rather than on the
+shared threadpool, where a burst of logins would starve every other endpoint.
+The pool has a bounded queue: once PASSWORD_WORKERS + PASSWORD_QUEUE_LIMIT
+calls are in flight, new ones fail fast with 503 instead of piling up.
+
+The cost comes from BCRYPT_ROUNDS; hashes made with another cost are
+rehashed transparently on the next successful login. passlib is imported
+on first use (in the worker processes), not when the app starts.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_context = None
+_pool: Optional[ProcessPoolExecutor] = None
+_in_flight = 0
+_rejected = 0
+
+def get_crypt_context():
+    global _context
+    if _context is None:
+        from passlib.context import CryptContext
+
+        _context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+    return _context
+
+def verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(matches, new hash if the stored one uses outdated parameters). Runs in a worker process."""
+    return get_crypt_context().verify_and_update(password, hashed_password)
+
+def hash_password(password: str) -> str:
+    """Runs in a worker process."""
+    return get_crypt_context().hash(password)
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # forkserver for the same reason as the image pool (see images.get_pool):
+        # the first login happens after the server has started its threads
+        context = get_context("forkserver")
+        context.set_forkserver_preload(["passwords"])
+        _pool = ProcessPoolExecutor(max_workers=settings.PASSWORD_WORKERS, mp_context=context)
+    return _pool
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, please try again",
+        headers={"Retry-After": "1"},
+    )
+
+async def _run(function, *args):
+    global _in_flight, _rejected
+    if _in_flight >= settings.PASSWORD_WORKERS + settings.PASSWORD_QUEUE_LIMIT:
+        _rejected += 1
+        raise _busy()
+    _in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_pool(), function, *args)
+    except BrokenProcessPool as e:
+        logger.error("Password worker pool broke: %s", e)
+        shutdown_pool()
+        raise _busy()
+    finally:
+        _in_flight -= 1
+
+async def verify(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Check `password`; also returns the rehashed value when the stored hash is outdated."""
+    return await _run(verify_and_update, password, hashed_password)
+
+async def create_hash(password: str) -> str:
+    return await _run(hash_password, password)
+
+def stats() -> dict:
+    return {
+        "workers": settings.PASSWORD_WORKERS,
+        "queue_limit": settings.PASSWORD_QUEUE_LIMIT,
+        "in_flight": _in_flight,
+        "rejected": _rejected,
+    }
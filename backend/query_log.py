@@ -0,0 +1,174 @@
+"""
+Slow-query log and per-request statement budget.
+
+Statements slower than SLOW_QUERY_MS are logged with their EXPLAIN QUERY
+PLAN, and plans that scan a whole table are flagged. The plan is captured
+once per distinct statement, on the same connection right after it ran, so
+the overhead is paid only by slow statements.
+
+Requests running more than QUERY_BUDGET statements are logged with the
+statements they repeated most: the same SELECT issued once per row is the
+N+1 pattern the budget is meant to catch. Per-request counts come from the
+request instrumentation in metrics.py.
+
+Both keep a rolling top-N (QUERY_LOG_SIZE entries, least recently seen
+evicted first), exposed to admins at /api/dashboard/queries.
+"""
+
+import logging
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import List, Optional
+from sqlalchemy import event
+from config import settings
+from metrics import RequestStats, current_request, request_hooks
+
+logger = logging.getLogger(__name__)
+
+# Statements EXPLAIN QUERY PLAN accepts
+EXPLAINABLE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH|REPLACE)\b", re.IGNORECASE)
+
+# "SCAN commissions" (or "SCAN TABLE commissions" before SQLite 3.36) without
+# an index; index scans, FTS virtual tables and subqueries say so after the name
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+# Statements repeated this often within one request are reported as likely N+1
+REPEATED_STATEMENT = 5
+
+def _compact(statement: str) -> str:
+    return " ".join(statement.split())
+
+class RollingLog:
+    """At most `size` entries by key; the least recently updated one is evicted."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.entries: "OrderedDict[object, dict]" = OrderedDict()
+        self._lock = Lock()
+
+    def update(self, key, create, apply) -> None:
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                entry = create()
+                if len(self.entries) >= self.size:
+                    self.entries.popitem(last=False)
+            apply(entry)
+            self.entries[key] = entry
+
+    def top(self, sort_key: str, limit: int) -> List[dict]:
+        with self._lock:
+            entries = [dict(entry) for entry in self.entries.values()]
+        return sorted(entries, key=lambda entry: entry[sort_key], reverse=True)[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+
+slow_queries = RollingLog(settings.QUERY_LOG_SIZE)
+over_budget = RollingLog(settings.QUERY_LOG_SIZE)
+
+def _explain(conn, statement: str, parameters, executemany: bool) -> Optional[List[str]]:
+    if not EXPLAINABLE.match(statement):
+        return None
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    explain_cursor = None
+    try:
+        # A raw DBAPI cursor on the same connection: no engine events, and it
+        # sees the same schema and uncommitted state as the statement itself
+        explain_cursor = conn.connection.cursor()
+        explain_cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+        return [row[-1] for row in explain_cursor.fetchall()]
+    except Exception as e:
+        return [f"EXPLAIN failed: {e}"]
+    finally:
+        if explain_cursor is not None:
+            explain_cursor.close()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_log_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - context._query_log_started) * 1000
+    if elapsed_ms < settings.SLOW_QUERY_MS:
+        return
+    text = _compact(statement)
+    entry = slow_queries.entries.get(text)
+    plan = entry["plan"] if entry is not None else _explain(conn, statement, parameters, executemany)
+    full_scans = sorted({
+        match.group(1) for match in (FULL_SCAN.match(detail) for detail in plan or []) if match
+    })
+    stats = current_request.get()
+    route = f"{stats.method} {stats.route}" if stats is not None else None
+
+    def create():
+        return {
+            "statement": text, "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+            "plan": plan, "full_scans": full_scans,
+        }
+
+    def apply(entry):
+        entry["count"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + elapsed_ms, 3)
+        entry["max_ms"] = round(max(entry["max_ms"], elapsed_ms), 3)
+        entry["last_ms"] = round(elapsed_ms, 3)
+        entry["last_route"] = route
+        entry["last_seen"] = time.time()
+
+    slow_queries.update(text, create, apply)
+    logger.warning(
+        "Slow query (%.1f ms%s%s): %s | plan: %s",
+        elapsed_ms,
+        f", {route}" if route else "",
+        f", full scan of {', '.join(full_scans)}" if full_scans else "",
+        text,
+        "; ".join(plan or ["-"]),
+    )
+
+def _check_budget(stats: RequestStats) -> None:
+    if stats.queries <= settings.QUERY_BUDGET:
+        return
+    repeated = [
+        {"statement": _compact(statement), "count": count}
+        for statement, count in sorted(stats.statements.items(), key=lambda item: item[1], reverse=True)
+        if count >= REPEATED_STATEMENT
+    ][:5]
+
+    def create():
+        return {"method": stats.method, "route": stats.route, "requests": 0, "max_queries": 0}
+
+    def apply(entry):
+        entry["requests"] += 1
+        entry["max_queries"] = max(entry["max_queries"], stats.queries)
+        entry["last_queries"] = stats.queries
+        entry["repeated"] = repeated
+        entry["last_seen"] = time.time()
+
+    over_budget.update((stats.method, stats.route), create, apply)
+    logger.warning(
+        "%s %s ran %d SQL statements (budget %d)%s",
+        stats.method, stats.route, stats.queries, settings.QUERY_BUDGET,
+        f"; repeated: {repeated[0]['count']}x {repeated[0]['statement']}" if repeated else "",
+    )
+
+def install(*engines) -> None:
+    """Log the slow statements of these (sync) engines and check each request's budget."""
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    request_hooks.append(_check_budget)
+
+def report(limit: int, sort: str) -> dict:
+    return {
+        "slow_query_ms": settings.SLOW_QUERY_MS,
+        "query_budget": settings.QUERY_BUDGET,
+        "slow_queries": slow_queries.top(sort, limit),
+        "over_budget": over_budget.top("requests" if sort == "count" else "max_queries", limit),
+    }
+
+def reset() -> None:
+    slow_queries.clear()
+    over_budget.clear()
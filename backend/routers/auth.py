@@ -1,13 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
-from typing import Optional
-from schemas import UserCreate, UserRead, Token, TokenData, MessageResponse
+from collections import OrderedDict
+from typing import Optional, Tuple
+from schemas import UserCreate, UserRead, UserUpdate, Token, TokenData, MessageResponse
 from models import User
 from database import get_db
+from config import settings
+import passwords
+import time
 import uuid
 import os
 
@@ -18,16 +21,16 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    verified, _ = await passwords.verify(plain_password, hashed_password)
+    return verified
 
-def get_password_hash(password: str) -> str:
+async def get_password_hash(password: str) -> str:
     """Hash a password."""
-    return pwd_context.hash(password)
+    return await passwords.create_hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
@@ -37,29 +40,102 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    # Imported on first use: python-jose loads the cryptography backends (~50 ms)
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_user_by_email(db: Session, email: str) -> Optional[User]:
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     """Get user by email."""
-    return db.query(User).filter(User.email == email).first()
+    return await db.scalar(select(User).where(User.email == email))
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+class UserCache:
+    """
+    Bounded LRU cache of authenticated users, keyed by token subject (email).
+
+    Entries are read-only UserRead snapshots, so authorization does not touch
+    SQLite while a user's entry is warm. Handlers that change a user call
+    `invalidate` after committing; `ttl` bounds how long changes made by other
+    worker processes can go unnoticed.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._users: "OrderedDict[str, Tuple[UserRead, float]]" = OrderedDict()
+        self._generation = 0
+
+    async def get(self, db: AsyncSession, email: str) -> Optional[UserRead]:
+        entry = self._users.get(email)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self._users.move_to_end(email)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        generation = self._generation
+        user = await get_user_by_email(db, email)
+        if user is None:
+            self._users.pop(email, None)
+            return None
+        principal = UserRead.model_validate(user)
+        # Invalidated while loading: serve this snapshot once, reload next time
+        if generation == self._generation and self.max_size > 0:
+            self._users[email] = (principal, time.monotonic())
+            self._users.move_to_end(email)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+                self.evictions += 1
+        return principal
+
+    def invalidate(self, email: str) -> None:
+        """Drop a user after a committed change to it."""
+        self._generation += 1
+        self._users.pop(email, None)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._users.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "size": len(self._users),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+        }
+
+user_cache = UserCache(max_size=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
     """Authenticate a user."""
-    user = get_user_by_email(db, email)
+    user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    # bcrypt is CPU bound: it runs in the password process pool
+    verified, new_hash = await passwords.verify(password, user.hashed_password)
+    if not verified:
         return None
+    if new_hash:
+        # Stored with outdated parameters (e.g. BCRYPT_ROUNDS changed): upgrade it now
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Get the current authenticated user."""
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> UserRead:
+    """Get the current authenticated user (served from the user cache when warm)."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -69,18 +145,18 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = get_user_by_email(db, email=token_data.email)
+    user = await user_cache.get(db, email=token_data.email)
     if user is None:
         raise credentials_exception
     return user
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
+async def get_current_active_user(current_user: UserRead = Depends(get_current_user)):
     """Get the current active user."""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-async def get_current_admin_user(current_user: User = Depends(get_current_active_user)):
+async def get_current_admin_user(current_user: UserRead = Depends(get_current_active_user)):
     """Get the current admin user."""
     if current_user.role != "admin":
         raise HTTPException(
@@ -90,22 +166,22 @@ async def get_current_admin_user(current_user: User = Depends(get_current_active
     return current_user
 
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Register a new user.
     """
     # Check if user already exists
-    existing_user = get_user_by_email(db, user_data.email)
+    existing_user = await get_user_by_email(db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
+    # Hashed outside the try: a saturated password pool must surface as 503, not 400
+    hashed_password = await get_password_hash(user_data.password)
+    
     try:
-        # Hash the password
-        hashed_password = get_password_hash(user_data.password)
-        
         # Create new user
         new_user = User(
             id=str(uuid.uuid4()),
@@ -116,26 +192,26 @@ def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
         )
         
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         
         return new_user
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error creating user: {str(e)}"
         )
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Login and get access token.
     """
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -149,14 +225,14 @@ def login_for_access_token(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/login", response_model=dict)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Alternative login endpoint that returns user info along with token.
     """
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -181,29 +257,59 @@ def login(
     }
 
 @router.get("/me", response_model=UserRead)
-def read_current_user(current_user: User = Depends(get_current_active_user)):
+async def read_current_user(current_user: UserRead = Depends(get_current_active_user)):
     """
     Get current user information.
     """
     return current_user
 
+@router.put("/me", response_model=UserRead)
+async def update_current_user(
+    update_data: UserUpdate,
+    current_user: UserRead = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Update the current user's profile (display name, avatar).
+    """
+    user = await db.get(User, current_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    try:
+        for field, value in update_data.dict(exclude_unset=True).items():
+            setattr(user, field, value)
+        await db.commit()
+        await db.refresh(user)
+        user_cache.invalidate(user.email)
+        return user
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error updating user: {str(e)}"
+        )
+
 @router.post("/logout", response_model=MessageResponse)
-def logout():
+async def logout():
     """
     Logout endpoint (client should discard the token).
     """
     return MessageResponse(message="Successfully logged out")
 
 @router.post("/create-admin", response_model=UserRead)
-def create_admin_user(
+async def create_admin_user(
     admin_data: UserCreate, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create an admin user. This endpoint should be protected in production.
     """
     # Check if admin already exists
-    existing_admin = db.query(User).filter(User.role == "admin").first()
+    existing_admin = await db.scalar(select(User).where(User.role == "admin").limit(1))
     if existing_admin:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -211,17 +317,17 @@ def create_admin_user(
         )
     
     # Check if user with this email already exists
-    existing_user = get_user_by_email(db, admin_data.email)
+    existing_user = await get_user_by_email(db, admin_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
+    # Hashed outside the try: a saturated password pool must surface as 503, not 400
+    hashed_password = await get_password_hash(admin_data.password)
+    
     try:
-        # Hash the password
-        hashed_password = get_password_hash(admin_data.password)
-        
         # Create admin user
         admin_user = User(
             id=str(uuid.uuid4()),
@@ -232,19 +338,19 @@ def create_admin_user(
         )
         
         db.add(admin_user)
-        db.commit()
-        db.refresh(admin_user)
+        await db.commit()
+        await db.refresh(admin_user)
         
         return admin_user
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error creating admin user: {str(e)}"
         )
 
 @router.get("/verify-admin")
-def verify_admin_access(current_user: User = Depends(get_current_admin_user)):
+async def verify_admin_access(current_user: UserRead = Depends(get_current_admin_user)):
     """
     Verify admin access.
     """
@@ -258,22 +364,22 @@ def verify_admin_access(current_user: User = Depends(get_current_admin_user)):
     }
 
 @router.get("/users", response_model=list[UserRead])
-def list_users(
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+async def list_users(
+    current_user: UserRead = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     List all users (admin only).
     """
-    users = db.query(User).all()
-    return users
+    users = await db.scalars(select(User))
+    return users.all()
 
 @router.put("/users/{user_id}/role")
-def update_user_role(
+async def update_user_role(
     user_id: str,
     new_role: str,
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: UserRead = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update user role (admin only).
@@ -284,7 +390,7 @@ def update_user_role(
             detail="Invalid role. Must be 'user' or 'admin'"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -293,8 +399,9 @@ def update_user_role(
     
     try:
         user.role = new_role
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
+        user_cache.invalidate(user.email)
         
         return {
             "message": f"User role updated to {new_role}",
@@ -305,8 +412,53 @@ def update_user_role(
             }
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error updating user role: {str(e)}"
         )
+
+@router.put("/users/{user_id}/active")
+async def update_user_active(
+    user_id: str,
+    is_active: bool,
+    current_user: UserRead = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Activate or deactivate a user (admin only).
+    """
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    try:
+        user.is_active = is_active
+        await db.commit()
+        await db.refresh(user)
+        user_cache.invalidate(user.email)
+        
+        return {
+            "message": f"User {'activated' if is_active else 'deactivated'}",
+            "user": {
+                "id": user.id,
+                "email": user.email,
+                "is_active": user.is_active
+            }
+        }
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error updating user status: {str(e)}"
+        )
+
+@router.get("/cache/stats")
+async def get_user_cache_stats(current_user: UserRead = Depends(get_current_admin_user)):
+    """
+    Get hit/miss counters of the authenticated-user cache (admin only).
+    """
+    return user_cache.stats()
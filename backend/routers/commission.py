@@ -1,42 +1,212 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, File, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from schemas import (
     CommissionRequestCreate, 
     CommissionRequestRead, 
     CommissionRequestUpdate,
-    MessageResponse
+    CommissionBulkUpdate,
+    CommissionBulkUpdateResult,
+    CommissionImportRow,
+    CommissionSearchResult,
+    ImportReport,
+    MessageResponse,
+    UserRead
 )
 from models import CommissionRequest
 from database import get_db
+from config import settings
+from pagination import NEXT_CURSOR_HEADER, keyset_page, split_page, split_rows
+from fast_json import RowSerializer
+from search import join_search, marked, matching, search_page, search_table, snippet, split_search_page
+from routers.auth import get_current_admin_user
+from bulk import FORMAT_PATTERN, FORMATS, export_rows, import_format, import_rows
+from datetime import datetime
+from stats import COMMISSIONS_TOTAL, read_counters
+from http_cache import conditional_on_tables
 import uuid
 
 router = APIRouter(prefix="/commissions", tags=["Commissions"])
 
+# Column select + orjson rendering for the FAST_JSON_RESPONSES list path
+commission_rows = RowSerializer(CommissionRequestRead, CommissionRequest)
+
+# FTS5 index over client identity, description and notes (migrations/0008_commission_search.py)
+commission_search = search_table("commission_search")
+
 @router.get("/", response_model=List[CommissionRequestRead])
-def read_commissions(
-    skip: int = Query(0, ge=0),
+async def read_commissions(
+    request: Request,
+    response: Response,
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(100, ge=1, le=1000),
     status_filter: Optional[str] = Query(None, description="Filter by status"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Retrieve all commission requests with optional filtering and pagination.
+    Retrieve commission requests (newest first) with optional filtering and cursor pagination.
     """
-    query = db.query(CommissionRequest)
+    not_modified = await conditional_on_tables(request, response, db, "commissions")
+    if not_modified:
+        return not_modified
+    
+    query = commission_rows.select() if settings.FAST_JSON_RESPONSES else select(CommissionRequest)
     
     if status_filter:
-        query = query.filter(CommissionRequest.status == status_filter)
+        query = query.where(CommissionRequest.status == status_filter)
+    
+    query = keyset_page(query, CommissionRequest, after, limit)
+    if skip:
+        query = query.offset(skip)
+    
+    result = await db.execute(query)
+    if settings.FAST_JSON_RESPONSES:
+        rows, next_cursor = split_rows(result.all(), limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return commission_rows.render(rows, response.headers)
     
-    commissions = query.offset(skip).limit(limit).all()
+    commissions, next_cursor = split_page(result.all(), limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return commissions
 
+@router.get("/search", response_model=List[CommissionSearchResult])
+async def search_commissions(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in name, Discord ID, email, description or notes (prefix match)"),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    status_filter: Optional[str] = Query(None, description="Filter by status"),
+    progress_filter: Optional[str] = Query(None, description="Filter by progress status"),
+    current_user: UserRead = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Full-text search of commission requests (admin only), best matches first.
+    """
+    not_modified = await conditional_on_tables(request, response, db, "commissions")
+    if not_modified:
+        return not_modified
+    
+    query = select(CommissionRequest, snippet(commission_search).label("snippet"))
+    query = matching(join_search(query, CommissionRequest, commission_search), commission_search, q)
+    
+    if status_filter:
+        query = query.where(CommissionRequest.status == status_filter)
+    
+    if progress_filter:
+        query = query.where(CommissionRequest.progress_status == progress_filter)
+    
+    query = search_page(query, commission_search, after, limit)
+    result = await db.execute(query)
+    rows, next_cursor = split_search_page(result.all(), limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [
+        CommissionSearchResult(
+            **CommissionRequestRead.model_validate(row.CommissionRequest).model_dump(),
+            snippet=marked(row.snippet),
+            rank=row.search_rank,
+        )
+        for row in rows
+    ]
+
+@router.get("/export")
+async def export_commissions(
+    export_format: str = Query("csv", alias="format", pattern=FORMAT_PATTERN, description="csv or ndjson"),
+    status_filter: Optional[str] = Query(None, description="Filter by status"),
+    progress_filter: Optional[str] = Query(None, description="Filter by progress status"),
+    current_user: UserRead = Depends(get_current_admin_user)
+):
+    """
+    Stream all commission requests (newest first) as CSV or NDJSON (admin only).
+    """
+    filters = []
+    if status_filter:
+        filters.append(CommissionRequest.status == status_filter)
+    if progress_filter:
+        filters.append(CommissionRequest.progress_status == progress_filter)
+    
+    filename = f"commissions-{datetime.utcnow():%Y%m%d-%H%M%S}.{export_format}"
+    return StreamingResponse(
+        export_rows(commission_rows, CommissionRequest, filters, export_format),
+        media_type=FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/import", response_model=ImportReport)
+async def import_commissions(
+    file: UploadFile = File(..., description="CSV (with header) or NDJSON, same columns as the export"),
+    requested_format: Optional[str] = Query(None, alias="format", pattern=FORMAT_PATTERN, description="csv or ndjson (default: from the file extension)"),
+    current_user: UserRead = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Import commission requests in batches (admin only), reporting the rows that failed.
+    """
+    # Rows without timestamps are stamped with the import time, like CURRENT_TIMESTAMP
+    imported_at = datetime.utcnow().replace(microsecond=0)
+    return await import_rows(
+        db,
+        file,
+        import_format(requested_format, file.filename),
+        CommissionImportRow,
+        CommissionRequest,
+        lambda: {"id": str(uuid.uuid4()), "created_at": imported_at, "updated_at": imported_at},
+    )
+
+@router.post("/bulk-update", response_model=CommissionBulkUpdateResult)
+async def bulk_update_commissions(
+    bulk: CommissionBulkUpdate,
+    current_user: UserRead = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Apply one patch to many commission requests (admin only), by ids or by filter.
+    
+    A single UPDATE ... RETURNING in one transaction; the counters and table
+    versions follow through their triggers.
+    """
+    if bulk.ids is not None:
+        condition = CommissionRequest.id.in_(bulk.ids)
+    else:
+        condition = and_(*(
+            getattr(CommissionRequest, field) == value
+            for field, value in bulk.where.model_dump(exclude_none=True).items()
+        ))
+    
+    statement = (
+        update(CommissionRequest)
+        .where(condition)
+        .values(**bulk.changes.model_dump(exclude_unset=True))
+        .returning(CommissionRequest.__table__)
+    )
+    try:
+        result = await db.execute(statement)
+        # Validated before the commit, so a bad row rolls back instead of failing after it
+        items = [CommissionRequestRead.model_validate(row) for row in result.all()]
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail=f"Error updating commission requests: {str(e)}"
+        )
+    
+    not_found = sorted(set(bulk.ids) - {item.id for item in items}) if bulk.ids is not None else []
+    return CommissionBulkUpdateResult(updated=len(items), items=items, not_found=not_found)
+
 @router.get("/{commission_id}", response_model=CommissionRequestRead)
-def read_commission(commission_id: str, db: Session = Depends(get_db)):
+async def read_commission(commission_id: str, db: AsyncSession = Depends(get_db)):
     """
     Retrieve a specific commission request by ID.
     """
-    commission = db.query(CommissionRequest).filter(CommissionRequest.id == commission_id).first()
+    commission = await db.get(CommissionRequest, commission_id)
     if not commission:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
@@ -45,7 +215,7 @@ def read_commission(commission_id: str, db: Session = Depends(get_db)):
     return commission
 
 @router.post("/", response_model=CommissionRequestRead, status_code=status.HTTP_201_CREATED)
-def create_commission(request: CommissionRequestCreate, db: Session = Depends(get_db)):
+async def create_commission(request: CommissionRequestCreate, db: AsyncSession = Depends(get_db)):
     """
     Create a new commission request.
     """
@@ -59,26 +229,26 @@ def create_commission(request: CommissionRequestCreate, db: Session = Depends(ge
             file_reference=request.file_reference
         )
         db.add(new_commission)
-        db.commit()
-        db.refresh(new_commission)
+        await db.commit()
+        await db.refresh(new_commission)
         return new_commission
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Error creating commission request: {str(e)}"
         )
 
 @router.put("/{commission_id}", response_model=CommissionRequestRead)
-def update_commission(
+async def update_commission(
     commission_id: str, 
     update_data: CommissionRequestUpdate, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update a commission request (status, payment status, progress status, notes).
     """
-    commission = db.query(CommissionRequest).filter(CommissionRequest.id == commission_id).first()
+    commission = await db.get(CommissionRequest, commission_id)
     if not commission:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
@@ -91,22 +261,22 @@ def update_commission(
         for field, value in update_dict.items():
             setattr(commission, field, value)
         
-        db.commit()
-        db.refresh(commission)
+        await db.commit()
+        await db.refresh(commission)
         return commission
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Error updating commission request: {str(e)}"
         )
 
 @router.delete("/{commission_id}", response_model=MessageResponse)
-def delete_commission(commission_id: str, db: Session = Depends(get_db)):
+async def delete_commission(commission_id: str, db: AsyncSession = Depends(get_db)):
     """
     Delete a commission request.
     """
-    commission = db.query(CommissionRequest).filter(CommissionRequest.id == commission_id).first()
+    commission = await db.get(CommissionRequest, commission_id)
     if not commission:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
@@ -114,29 +284,26 @@ def delete_commission(commission_id: str, db: Session = Depends(get_db)):
         )
     
     try:
-        db.delete(commission)
-        db.commit()
+        await db.delete(commission)
+        await db.commit()
         return MessageResponse(message="Commission request deleted successfully")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Error deleting commission request: {str(e)}"
         )
 
 @router.get("/stats/summary")
-def get_commission_stats(db: Session = Depends(get_db)):
+async def get_commission_stats(db: AsyncSession = Depends(get_db)):
     """
     Get commission statistics summary.
     """
-    total_requests = db.query(CommissionRequest).count()
-    pending_requests = db.query(CommissionRequest).filter(CommissionRequest.status == "pending").count()
-    in_progress_requests = db.query(CommissionRequest).filter(CommissionRequest.progress_status == "in_progress").count()
-    completed_requests = db.query(CommissionRequest).filter(CommissionRequest.status == "completed").count()
+    counters = await read_counters(db)
     
     return {
-        "total_requests": total_requests,
-        "pending_requests": pending_requests,
-        "in_progress_requests": in_progress_requests,
-        "completed_requests": completed_requests
+        "total_requests": counters.get(COMMISSIONS_TOTAL),
+        "pending_requests": counters.commission_status("pending"),
+        "in_progress_requests": counters.commission_progress("in_progress"),
+        "completed_requests": counters.commission_status("completed")
     }
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from schemas import DashboardStatsResponse, MessageResponse, UserRead
+from database import get_db
+from stats import COMMISSIONS_TOTAL, PORTFOLIO_TOTAL, read_counters
+from routers.auth import get_current_admin_user
+from routers.settings import are_commissions_open
+import query_log
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+@router.get("/stats", response_model=DashboardStatsResponse)
+async def get_dashboard_stats(db: AsyncSession = Depends(get_db)):
+    """
+    Get the admin dashboard statistics from the maintained counters.
+    """
+    counters = await read_counters(db)
+    
+    return DashboardStatsResponse(
+        commissions_open=await are_commissions_open(db),
+        total_requests=counters.get(COMMISSIONS_TOTAL),
+        pending_requests=counters.commission_status("pending"),
+        portfolio_items=counters.get(PORTFOLIO_TOTAL),
+        categories=counters.portfolio_categories()
+    )
+
+@router.get("/queries")
+async def get_query_log(
+    limit: int = Query(20, ge=1, le=100),
+    sort: str = Query("max_ms", pattern="^(max_ms|total_ms|count)$"),
+    current_user: UserRead = Depends(get_current_admin_user)
+):
+    """
+    Slowest statements (with query plan and full-table scans) and the routes over
+    the per-request statement budget (admin only).
+    """
+    return query_log.report(limit, sort)
+
+@router.delete("/queries", response_model=MessageResponse)
+async def reset_query_log(current_user: UserRead = Depends(get_current_admin_user)):
+    """
+    Clear the slow-query log (admin only).
+    """
+    query_log.reset()
+    return MessageResponse(message="Query log cleared")
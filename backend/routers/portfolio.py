@@ -1,59 +1,144 @@
-from fastapi import APIRouter, Depends, File, UploadFile, Form, HTTPException, status, Query
+from fastapi import APIRouter, Depends, File, UploadFile, Form, HTTPException, status, Query, Request, Response
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from schemas import PortfolioItemRead, PortfolioItemUpdate, MessageResponse
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
+from pydantic import ValidationError
+from schemas import (
+    PortfolioBatchEntry, PortfolioBatchItemResult, PortfolioBatchResult, PortfolioItemRead,
+    PortfolioItemUpdate, PortfolioSearchResult, MessageResponse, UserRead
+)
 from models import PortfolioItem, PortfolioCategory
-from database import get_db
+from database import get_db, open_session
+from routers.auth import get_current_admin_user
+from bulk import validation_message
+from pagination import NEXT_CURSOR_HEADER, keyset_page, split_page, split_rows
+from fast_json import RowSerializer
+from search import (
+    highlight, join_search, marked, matching, search_page, search_table, snippet, split_search_page
+)
+from stats import PORTFOLIO_FEATURED, PORTFOLIO_TOTAL, read_counters
+from http_cache import conditional_on_tables
+from images import InvalidImage, create_variants, remove_variants
+from storage import is_blob_url, release_blobs, save_upload
+from config import settings
+import asyncio
+import json
 import uuid
 import os
-import aiofiles
 from pathlib import Path
 
 router = APIRouter(prefix="/portfolio", tags=["Portfolio"])
-UPLOAD_DIR = "uploads/portfolio"
-
-# Ensure the upload directory exists
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 # Allowed image extensions
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 
+# Column select + orjson rendering for the FAST_JSON_RESPONSES list path
+portfolio_rows = RowSerializer(PortfolioItemRead, PortfolioItem)
+
+# FTS5 index over title/description/category (migrations/0007_portfolio_search.py)
+portfolio_search = search_table("portfolio_search")
+
 def validate_image_file(filename: str) -> bool:
     """Validate if the uploaded file is an allowed image format."""
     return Path(filename).suffix.lower() in ALLOWED_EXTENSIONS
 
 @router.get("/", response_model=List[PortfolioItemRead])
-def read_portfolio_items(
-    skip: int = Query(0, ge=0),
+async def read_portfolio_items(
+    request: Request,
+    response: Response,
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(100, ge=1, le=1000),
     category: Optional[str] = Query(None, description="Filter by category"),
     featured_only: bool = Query(False, description="Show only featured items"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Retrieve portfolio items with optional filtering and pagination.
+    Retrieve portfolio items with optional filtering and cursor pagination.
     """
-    query = db.query(PortfolioItem)
+    not_modified = await conditional_on_tables(request, response, db, "portfolio_items")
+    if not_modified:
+        return not_modified
+    
+    query = portfolio_rows.select() if settings.FAST_JSON_RESPONSES else select(PortfolioItem)
     
     if category:
-        query = query.filter(PortfolioItem.category == category)
+        query = query.where(PortfolioItem.category == category)
     
     if featured_only:
-        query = query.filter(PortfolioItem.is_featured == True)
+        query = query.where(PortfolioItem.is_featured == True)
     
     # Order by creation date (newest first)
-    query = query.order_by(PortfolioItem.created_at.desc())
+    query = keyset_page(query, PortfolioItem, after, limit)
+    if skip:
+        query = query.offset(skip)
+    
+    result = await db.execute(query)
+    if settings.FAST_JSON_RESPONSES:
+        rows, next_cursor = split_rows(result.all(), limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return portfolio_rows.render(rows, response.headers)
     
-    items = query.offset(skip).limit(limit).all()
+    items, next_cursor = split_page(result.all(), limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return items
 
+@router.get("/search", response_model=List[PortfolioSearchResult])
+async def search_portfolio_items(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in title, description or category (prefix match)"),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    featured_only: bool = Query(False, description="Show only featured items"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Full-text search of portfolio items, best matches first, with highlighted snippets.
+    """
+    not_modified = await conditional_on_tables(request, response, db, "portfolio_items")
+    if not_modified:
+        return not_modified
+    
+    query = select(
+        PortfolioItem,
+        highlight(portfolio_search, 0).label("title_highlight"),
+        snippet(portfolio_search).label("snippet"),
+    )
+    query = matching(join_search(query, PortfolioItem, portfolio_search), portfolio_search, q)
+    
+    if category:
+        query = query.where(PortfolioItem.category == category)
+    
+    if featured_only:
+        query = query.where(PortfolioItem.is_featured == True)
+    
+    query = search_page(query, portfolio_search, after, limit)
+    result = await db.execute(query)
+    rows, next_cursor = split_search_page(result.all(), limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [
+        PortfolioSearchResult(
+            **PortfolioItemRead.model_validate(row.PortfolioItem).model_dump(),
+            title_highlight=marked(row.title_highlight),
+            snippet=marked(row.snippet),
+            rank=row.search_rank,
+        )
+        for row in rows
+    ]
+
 @router.get("/{item_id}", response_model=PortfolioItemRead)
-def read_portfolio_item(item_id: str, db: Session = Depends(get_db)):
+async def read_portfolio_item(item_id: str, db: AsyncSession = Depends(get_db)):
     """
     Retrieve a specific portfolio item by ID.
     """
-    item = db.query(PortfolioItem).filter(PortfolioItem.id == item_id).first()
+    item = await db.get(PortfolioItem, item_id)
     if not item:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
@@ -68,7 +153,7 @@ async def create_portfolio_item(
     category: str = Form(..., description="Category of the portfolio item"),
     is_featured: bool = Form(False, description="Whether this item is featured"),
     image: UploadFile = File(..., description="Image file for the portfolio item"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new portfolio item with image upload.
@@ -80,24 +165,13 @@ async def create_portfolio_item(
             detail=f"Invalid image format. Allowed formats: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # Validate file size (max 10MB)
-    max_size = 10 * 1024 * 1024  # 10MB
-    content = await image.read()
-    if len(content) > max_size:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, 
-            detail="File size too large. Maximum size is 10MB"
-        )
+    # Stream the file into the content-addressed store, rejecting it as soon as it exceeds the size limit
+    file_ext = Path(image.filename).suffix.lower()
+    stored = await save_upload(image, file_ext, settings.MAX_FILE_SIZE)
     
     try:
-        # Generate unique filename
-        file_ext = Path(image.filename).suffix.lower()
-        unique_filename = f"{uuid.uuid4()}{file_ext}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-        
-        # Save file asynchronously
-        async with aiofiles.open(file_path, "wb") as out_file:
-            await out_file.write(content)
+        # Resized copies for srcset, generated in the image process pool
+        image_variants = await create_variants(stored.path, os.path.dirname(stored.url))
         
         # Create database record
         new_item = PortfolioItem(
@@ -106,35 +180,137 @@ async def create_portfolio_item(
             description=description,
             category=category,
             is_featured=is_featured,
-            image_url=f"/uploads/portfolio/{unique_filename}"  # Store relative URL
+            image_url=stored.url,  # Store relative URL
+            image_variants=image_variants
         )
         
         db.add(new_item)
-        db.commit()
-        db.refresh(new_item)
-        
-        return new_item
+        await db.commit()
+        await db.refresh(new_item)
         
     except Exception as e:
-        db.rollback()
-        # Clean up uploaded file if database operation failed
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        await db.rollback()
+        # Clean up uploaded file (and derivatives) unless another item shares it
+        await release_blobs(db, [], claims=[stored.url])
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Error creating portfolio item: {str(e)}"
         )
+    
+    # The committed item now holds the reference
+    await release_blobs(db, [], claims=[stored.url])
+    return new_item
+
+async def store_batch_image(
+    semaphore: asyncio.Semaphore, image: UploadFile, entry: object
+) -> Tuple[Optional[PortfolioItem], Optional[str]]:
+    """The (not yet added) item for one file of a batch upload, or why it was rejected."""
+    try:
+        fields = PortfolioBatchEntry.model_validate(entry)
+    except ValidationError as e:
+        return None, validation_message(e)
+    if not validate_image_file(image.filename or ""):
+        return None, f"Invalid image format. Allowed formats: {', '.join(ALLOWED_EXTENSIONS)}"
+    
+    async with semaphore:
+        try:
+            stored = await save_upload(image, Path(image.filename).suffix.lower(), settings.MAX_FILE_SIZE)
+        except HTTPException as e:
+            return None, e.detail
+        except (OSError, SQLAlchemyError) as e:
+            return None, f"Error storing image: {e}"
+        try:
+            image_variants = await create_variants(stored.path, os.path.dirname(stored.url))
+        except InvalidImage as e:
+            # No row will reference it: drop the claim (and the file unless shared)
+            async with open_session() as db:
+                await release_blobs(db, [], claims=[stored.url])
+            return None, str(e)
+    
+    return PortfolioItem(
+        id=str(uuid.uuid4()),
+        **fields.model_dump(),
+        image_url=stored.url,
+        image_variants=image_variants
+    ), None
+
+@router.post("/batch", response_model=PortfolioBatchResult)
+async def create_portfolio_items(
+    images: List[UploadFile] = File(..., description="Image files, one per portfolio item"),
+    metadata: str = Form(..., description="JSON array of {title, description, category, is_featured}, one per image, in the same order"),
+    current_user: UserRead = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Create many portfolio items at once (admin only), reporting the result of each file.
+    
+    Files are stored (and their derivatives generated) concurrently, at most
+    BATCH_UPLOAD_CONCURRENCY at a time; every accepted item is then inserted
+    in a single transaction. Rejected files do not prevent the others from
+    being created.
+    """
+    if len(images) > settings.BATCH_UPLOAD_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many files. Maximum is {settings.BATCH_UPLOAD_MAX_FILES} per batch"
+        )
+    try:
+        entries = json.loads(metadata)
+    except ValueError:
+        entries = None
+    if not isinstance(entries, list) or len(entries) != len(images):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="metadata must be a JSON array with one entry per image"
+        )
+    
+    semaphore = asyncio.Semaphore(settings.BATCH_UPLOAD_CONCURRENCY)
+    outcomes = await asyncio.gather(
+        *(store_batch_image(semaphore, image, entry) for image, entry in zip(images, entries))
+    )
+    new_items = [item for item, _ in outcomes if item is not None]
+    
+    created = {}
+    if new_items:
+        try:
+            db.add_all(new_items)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            # Clean up the stored files (and derivatives) unless other items share them
+            await release_blobs(db, [], claims=[item.image_url for item in new_items])
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Error creating portfolio items: {str(e)}"
+            )
+        await release_blobs(db, [], claims=[item.image_url for item in new_items])
+        # One query for the committed rows, with their server-side timestamps
+        result = await db.scalars(
+            select(PortfolioItem).where(PortfolioItem.id.in_([item.id for item in new_items]))
+        )
+        created = {item.id: item for item in result.all()}
+    
+    results = [
+        PortfolioBatchItemResult(
+            index=index,
+            filename=image.filename,
+            item=created[item.id] if item is not None else None,
+            error=error
+        )
+        for index, (image, (item, error)) in enumerate(zip(images, outcomes))
+    ]
+    return PortfolioBatchResult(created=len(new_items), failed=len(images) - len(new_items), results=results)
 
 @router.put("/{item_id}", response_model=PortfolioItemRead)
-def update_portfolio_item(
+async def update_portfolio_item(
     item_id: str, 
     update_data: PortfolioItemUpdate, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update a portfolio item (without changing the image).
     """
-    item = db.query(PortfolioItem).filter(PortfolioItem.id == item_id).first()
+    item = await db.get(PortfolioItem, item_id)
     if not item:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
@@ -147,22 +323,22 @@ def update_portfolio_item(
         for field, value in update_dict.items():
             setattr(item, field, value)
         
-        db.commit()
-        db.refresh(item)
+        await db.commit()
+        await db.refresh(item)
         return item
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Error updating portfolio item: {str(e)}"
         )
 
 @router.delete("/{item_id}", response_model=MessageResponse)
-def delete_portfolio_item(item_id: str, db: Session = Depends(get_db)):
+async def delete_portfolio_item(item_id: str, db: AsyncSession = Depends(get_db)):
     """
     Delete a portfolio item and its associated image file.
     """
-    item = db.query(PortfolioItem).filter(PortfolioItem.id == item_id).first()
+    item = await db.get(PortfolioItem, item_id)
     if not item:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
@@ -170,38 +346,47 @@ def delete_portfolio_item(item_id: str, db: Session = Depends(get_db)):
         )
     
     try:
-        # Delete the image file from local storage
-        if item.image_url.startswith("/uploads/"):
-            file_path = item.image_url[1:]  # Remove leading slash
+        # Delete the image file from local storage (uploads from before the blob store)
+        image_url = item.image_url
+        if image_url.startswith("/uploads/") and not is_blob_url(image_url):
+            file_path = image_url[1:]  # Remove leading slash
             if os.path.exists(file_path):
                 os.remove(file_path)
+            remove_variants(item.image_variants)
         
         # Delete from database
-        db.delete(item)
-        db.commit()
+        await db.delete(item)
+        await db.commit()
+        
+        # Blobs may be shared: removed only once nothing references them
+        await release_blobs(db, [image_url])
         
         return MessageResponse(message="Portfolio item deleted successfully")
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Error deleting portfolio item: {str(e)}"
         )
 
 @router.get("/categories/list")
-def get_portfolio_categories(db: Session = Depends(get_db)):
+async def get_portfolio_categories(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """
     Get all unique portfolio categories.
     """
+    not_modified = await conditional_on_tables(request, response, db, "portfolio_items", "portfolio_categories")
+    if not_modified:
+        return not_modified
+    
     # Get categories from portfolio items
-    categories = db.query(PortfolioItem.category).distinct().all()
-    category_list = [cat[0] for cat in categories if cat[0]]
+    categories = await db.scalars(select(PortfolioItem.category).distinct())
+    category_list = [cat for cat in categories.all() if cat]
     
     # Also get categories from the categories table if it exists
     try:
-        db_categories = db.query(PortfolioCategory).all()
-        for cat in db_categories:
+        db_categories = await db.scalars(select(PortfolioCategory))
+        for cat in db_categories.all():
             if cat.name not in category_list:
                 category_list.append(cat.name)
     except:
@@ -210,26 +395,24 @@ def get_portfolio_categories(db: Session = Depends(get_db)):
     return {"categories": sorted(category_list)}
 
 @router.get("/stats/summary")
-def get_portfolio_stats(db: Session = Depends(get_db)):
+async def get_portfolio_stats(db: AsyncSession = Depends(get_db)):
     """
     Get portfolio statistics summary.
     """
-    total_items = db.query(PortfolioItem).count()
-    featured_items = db.query(PortfolioItem).filter(PortfolioItem.is_featured == True).count()
-    categories = db.query(PortfolioItem.category).distinct().count()
+    counters = await read_counters(db)
     
     return {
-        "total_items": total_items,
-        "featured_items": featured_items,
-        "categories": categories
+        "total_items": counters.get(PORTFOLIO_TOTAL),
+        "featured_items": counters.get(PORTFOLIO_FEATURED),
+        "categories": counters.portfolio_categories()
     }
 
 @router.post("/{item_id}/toggle-featured", response_model=PortfolioItemRead)
-def toggle_featured_status(item_id: str, db: Session = Depends(get_db)):
+async def toggle_featured_status(item_id: str, db: AsyncSession = Depends(get_db)):
     """
     Toggle the featured status of a portfolio item.
     """
-    item = db.query(PortfolioItem).filter(PortfolioItem.id == item_id).first()
+    item = await db.get(PortfolioItem, item_id)
     if not item:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
@@ -238,11 +421,11 @@ def toggle_featured_status(item_id: str, db: Session = Depends(get_db)):
     
     try:
         item.is_featured = not item.is_featured
-        db.commit()
-        db.refresh(item)
+        await db.commit()
+        await db.refresh(item)
         return item
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Error updating featured status: {str(e)}"
@@ -1,24 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from schemas import SiteSettingRead, SiteSettingUpdate, SiteSettingCreate, MessageResponse
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from schemas import SiteSettingRead, SiteSettingUpdate, SiteSettingCreate, MessageResponse, UserRead
 from models import SiteSetting
 from database import get_db
-import uuid
+from routers.auth import get_current_admin_user
+from config import settings as app_settings
+from http_cache import is_not_modified, make_etag, not_modified, set_validators
+from storage import release_blobs, save_upload
+import asyncio
+import time
 import os
-import aiofiles
 from pathlib import Path
 
 router = APIRouter(prefix="/settings", tags=["Settings"])
 
-# Upload directories for different types of settings
-BACKGROUND_UPLOAD_DIR = "uploads/backgrounds"
-PROFILE_UPLOAD_DIR = "uploads/profiles"
-
-# Ensure upload directories exist
-os.makedirs(BACKGROUND_UPLOAD_DIR, exist_ok=True)
-os.makedirs(PROFILE_UPLOAD_DIR, exist_ok=True)
-
 # Allowed image extensions
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 
@@ -26,20 +24,131 @@ def validate_image_file(filename: str) -> bool:
     """Validate if the uploaded file is an allowed image format."""
     return Path(filename).suffix.lower() in ALLOWED_EXTENSIONS
 
+class SettingsCache:
+    """
+    In-process cache of every SiteSetting row.
+
+    All rows are loaded with a single query on first use and then kept current
+    write-through by the handlers of this router, so public reads do not touch
+    SQLite while the cache is warm. `ttl` bounds how long writes made by other
+    worker processes can go unnoticed.
+    """
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._settings: Optional[Dict[str, SiteSettingRead]] = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._validators = None
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        if self._settings is None:
+            return False
+        return not self.ttl or time.monotonic() - self._loaded_at < self.ttl
+
+    async def all(self, db: AsyncSession) -> Dict[str, SiteSettingRead]:
+        """All settings by key, loading them if needed."""
+        if self._is_fresh():
+            self.hits += 1
+            return self._settings
+        async with self._lock:
+            if self._is_fresh():
+                self.hits += 1
+                return self._settings
+            self.misses += 1
+            generation = self._generation
+            result = await db.scalars(select(SiteSetting).order_by(SiteSetting.id))
+            loaded = {row.key: SiteSettingRead.model_validate(row) for row in result.all()}
+            # A write landed while loading: serve this snapshot once, reload next time
+            if generation == self._generation:
+                self._settings = loaded
+                self._loaded_at = time.monotonic()
+                self._validators = None
+            return loaded
+
+    async def get(self, db: AsyncSession, key: str) -> Optional[SiteSettingRead]:
+        return (await self.all(db)).get(key)
+
+    def validators(self, settings: Dict[str, SiteSettingRead]) -> Tuple[str, Optional[datetime]]:
+        """ETag (content hash, memoized until the next change) and Last-Modified of a snapshot from `all`."""
+        if settings is self._settings and self._validators is not None:
+            return self._validators
+        validators = (
+            make_etag([setting.model_dump(mode="json") for setting in settings.values()]),
+            max((setting.updated_at for setting in settings.values()), default=None),
+        )
+        if settings is self._settings:
+            self._validators = validators
+        return validators
+
+    def put(self, setting: SiteSetting) -> None:
+        """Write-through after a committed insert or update."""
+        self._generation += 1
+        self._validators = None
+        if self._settings is not None:
+            self._settings[setting.key] = SiteSettingRead.model_validate(setting)
+
+    def remove(self, key: str) -> None:
+        """Write-through after a committed delete."""
+        self._generation += 1
+        self._validators = None
+        if self._settings is not None:
+            self._settings.pop(key, None)
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._settings = None
+        self._validators = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "loaded": self._settings is not None,
+            "size": len(self._settings or {}),
+        }
+
+settings_cache = SettingsCache(ttl=app_settings.SETTINGS_CACHE_TTL)
+
+def is_commissions_open(setting: Optional[SiteSettingRead]) -> bool:
+    """Parse the commissions_open setting (defaults to open when unset)."""
+    return setting.value.lower() == "true" if setting else True
+
+async def are_commissions_open(db: AsyncSession) -> bool:
+    """Whether commissions are currently open."""
+    return is_commissions_open(await settings_cache.get(db, "commissions_open"))
+
 @router.get("/", response_model=List[SiteSettingRead])
-def read_settings(db: Session = Depends(get_db)):
+async def read_settings(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """
     Retrieve all site settings.
     """
-    settings = db.query(SiteSetting).all()
-    return settings
+    # One cache lookup per request, so the hit/miss counters match requests
+    settings = await settings_cache.all(db)
+    etag, last_modified = settings_cache.validators(settings)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
+    return list(settings.values())
+
+@router.get("/cache/stats")
+async def get_settings_cache_stats(current_user: UserRead = Depends(get_current_admin_user)):
+    """
+    Get hit/miss counters of the settings cache (admin only).
+    """
+    return settings_cache.stats()
 
 @router.get("/{key}", response_model=SiteSettingRead)
-def read_setting(key: str, db: Session = Depends(get_db)):
+async def read_setting(key: str, db: AsyncSession = Depends(get_db)):
     """
     Retrieve a specific site setting by key.
     """
-    setting = db.query(SiteSetting).filter(SiteSetting.key == key).first()
+    setting = await settings_cache.get(db, key)
     if not setting:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
@@ -48,12 +157,12 @@ def read_setting(key: str, db: Session = Depends(get_db)):
     return setting
 
 @router.post("/", response_model=SiteSettingRead, status_code=status.HTTP_201_CREATED)
-def create_setting(setting_data: SiteSettingCreate, db: Session = Depends(get_db)):
+async def create_setting(setting_data: SiteSettingCreate, db: AsyncSession = Depends(get_db)):
     """
     Create a new site setting.
     """
     # Check if setting with this key already exists
-    existing_setting = db.query(SiteSetting).filter(SiteSetting.key == setting_data.key).first()
+    existing_setting = await db.scalar(select(SiteSetting).where(SiteSetting.key == setting_data.key))
     if existing_setting:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
@@ -67,22 +176,24 @@ def create_setting(setting_data: SiteSettingCreate, db: Session = Depends(get_db
             description=setting_data.description
         )
         db.add(new_setting)
-        db.commit()
-        db.refresh(new_setting)
+        await db.commit()
+        await db.refresh(new_setting)
+        settings_cache.put(new_setting)
         return new_setting
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Error creating setting: {str(e)}"
         )
 
 @router.put("/{key}", response_model=SiteSettingRead)
-def update_setting(key: str, update_data: SiteSettingUpdate, db: Session = Depends(get_db)):
+async def update_setting(key: str, update_data: SiteSettingUpdate, db: AsyncSession = Depends(get_db)):
     """
     Update a site setting by key. Creates the setting if it doesn't exist.
     """
-    setting = db.query(SiteSetting).filter(SiteSetting.key == key).first()
+    setting = await db.scalar(select(SiteSetting).where(SiteSetting.key == key))
+    old_url = setting.value if setting else None
     
     try:
         if not setting:
@@ -99,22 +210,24 @@ def update_setting(key: str, update_data: SiteSettingUpdate, db: Session = Depen
             if update_data.description is not None:
                 setting.description = update_data.description
         
-        db.commit()
-        db.refresh(setting)
+        await db.commit()
+        await db.refresh(setting)
+        settings_cache.put(setting)
+        await release_blobs(db, [old_url])
         return setting
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Error updating setting: {str(e)}"
         )
 
 @router.delete("/{key}", response_model=MessageResponse)
-def delete_setting(key: str, db: Session = Depends(get_db)):
+async def delete_setting(key: str, db: AsyncSession = Depends(get_db)):
     """
     Delete a site setting by key.
     """
-    setting = db.query(SiteSetting).filter(SiteSetting.key == key).first()
+    setting = await db.scalar(select(SiteSetting).where(SiteSetting.key == key))
     if not setting:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
@@ -122,11 +235,14 @@ def delete_setting(key: str, db: Session = Depends(get_db)):
         )
     
     try:
-        db.delete(setting)
-        db.commit()
+        old_url = setting.value
+        await db.delete(setting)
+        await db.commit()
+        settings_cache.remove(key)
+        await release_blobs(db, [old_url])
         return MessageResponse(message=f"Setting '{key}' deleted successfully")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Error deleting setting: {str(e)}"
@@ -136,7 +252,7 @@ def delete_setting(key: str, db: Session = Depends(get_db)):
 async def upload_background_image(
     description: Optional[str] = Form(None, description="Description for the background image"),
     image: UploadFile = File(..., description="Background image file"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Upload a new background image and update the background_image setting.
@@ -148,28 +264,15 @@ async def upload_background_image(
             detail=f"Invalid image format. Allowed formats: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # Validate file size (max 20MB for background images)
-    max_size = 20 * 1024 * 1024  # 20MB
-    content = await image.read()
-    if len(content) > max_size:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, 
-            detail="File size too large. Maximum size is 20MB"
-        )
+    # Stream the file into the content-addressed store, rejecting it as soon as it exceeds the size limit
+    file_ext = Path(image.filename).suffix.lower()
+    stored = await save_upload(image, file_ext, app_settings.MAX_BACKGROUND_SIZE)
     
+    old_url = None
     try:
-        # Generate unique filename
-        file_ext = Path(image.filename).suffix.lower()
-        unique_filename = f"background_{uuid.uuid4()}{file_ext}"
-        file_path = os.path.join(BACKGROUND_UPLOAD_DIR, unique_filename)
-        
-        # Save file asynchronously
-        async with aiofiles.open(file_path, "wb") as out_file:
-            await out_file.write(content)
-        
         # Update or create the background_image setting
-        image_url = f"/uploads/backgrounds/{unique_filename}"
-        setting = db.query(SiteSetting).filter(SiteSetting.key == "background_image").first()
+        image_url = stored.url
+        setting = await db.scalar(select(SiteSetting).where(SiteSetting.key == "background_image"))
         
         if not setting:
             setting = SiteSetting(
@@ -179,7 +282,8 @@ async def upload_background_image(
             )
             db.add(setting)
         else:
-            # Delete old background image if it exists
+            # Delete old background image if it exists (uploads from before the blob store)
+            old_url = setting.value
             if setting.value.startswith("/uploads/backgrounds/"):
                 old_file_path = setting.value[1:]  # Remove leading slash
                 if os.path.exists(old_file_path):
@@ -189,25 +293,28 @@ async def upload_background_image(
             if description:
                 setting.description = description
         
-        db.commit()
-        db.refresh(setting)
-        return setting
+        await db.commit()
+        await db.refresh(setting)
+        settings_cache.put(setting)
         
     except Exception as e:
-        db.rollback()
-        # Clean up uploaded file if database operation failed
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        await db.rollback()
+        # Clean up uploaded file unless it is already referenced elsewhere
+        await release_blobs(db, [], claims=[stored.url])
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Error uploading background image: {str(e)}"
         )
+    
+    # The setting now holds the reference to the new image
+    await release_blobs(db, [old_url], claims=[stored.url])
+    return setting
 
 @router.post("/profile-image", response_model=SiteSettingRead)
 async def upload_profile_image(
     description: Optional[str] = Form(None, description="Description for the profile image"),
     image: UploadFile = File(..., description="Profile image file"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Upload a new profile image and update the admin_profile_image setting.
@@ -219,28 +326,15 @@ async def upload_profile_image(
             detail=f"Invalid image format. Allowed formats: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # Validate file size (max 5MB for profile images)
-    max_size = 5 * 1024 * 1024  # 5MB
-    content = await image.read()
-    if len(content) > max_size:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, 
-            detail="File size too large. Maximum size is 5MB"
-        )
+    # Stream the file into the content-addressed store, rejecting it as soon as it exceeds the size limit
+    file_ext = Path(image.filename).suffix.lower()
+    stored = await save_upload(image, file_ext, app_settings.MAX_PROFILE_SIZE)
     
+    old_url = None
     try:
-        # Generate unique filename
-        file_ext = Path(image.filename).suffix.lower()
-        unique_filename = f"profile_{uuid.uuid4()}{file_ext}"
-        file_path = os.path.join(PROFILE_UPLOAD_DIR, unique_filename)
-        
-        # Save file asynchronously
-        async with aiofiles.open(file_path, "wb") as out_file:
-            await out_file.write(content)
-        
         # Update or create the admin_profile_image setting
-        image_url = f"/uploads/profiles/{unique_filename}"
-        setting = db.query(SiteSetting).filter(SiteSetting.key == "admin_profile_image").first()
+        image_url = stored.url
+        setting = await db.scalar(select(SiteSetting).where(SiteSetting.key == "admin_profile_image"))
         
         if not setting:
             setting = SiteSetting(
@@ -250,7 +344,8 @@ async def upload_profile_image(
             )
             db.add(setting)
         else:
-            # Delete old profile image if it exists
+            # Delete old profile image if it exists (uploads from before the blob store)
+            old_url = setting.value
             if setting.value.startswith("/uploads/profiles/"):
                 old_file_path = setting.value[1:]  # Remove leading slash
                 if os.path.exists(old_file_path):
@@ -260,40 +355,48 @@ async def upload_profile_image(
             if description:
                 setting.description = description
         
-        db.commit()
-        db.refresh(setting)
-        return setting
+        await db.commit()
+        await db.refresh(setting)
+        settings_cache.put(setting)
         
     except Exception as e:
-        db.rollback()
-        # Clean up uploaded file if database operation failed
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        await db.rollback()
+        # Clean up uploaded file unless it is already referenced elsewhere
+        await release_blobs(db, [], claims=[stored.url])
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Error uploading profile image: {str(e)}"
         )
+    
+    # The setting now holds the reference to the new image
+    await release_blobs(db, [old_url], claims=[stored.url])
+    return setting
 
 @router.get("/commissions/status")
-def get_commissions_status(db: Session = Depends(get_db)):
+async def get_commissions_status(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """
     Get the current commissions open/closed status.
     """
-    setting = db.query(SiteSetting).filter(SiteSetting.key == "commissions_open").first()
-    commissions_open = setting.value.lower() == "true" if setting else True
+    setting = await settings_cache.get(db, "commissions_open")
+    commissions_open = is_commissions_open(setting)
+    etag = make_etag("commissions_open", commissions_open)
+    last_modified = setting.updated_at if setting else None
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
     
     return {"commissions_open": commissions_open}
 
 @router.post("/commissions/status")
-def update_commissions_status(
+async def update_commissions_status(
     commissions_open: bool, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update the commissions open/closed status.
     """
     try:
-        setting = db.query(SiteSetting).filter(SiteSetting.key == "commissions_open").first()
+        setting = await db.scalar(select(SiteSetting).where(SiteSetting.key == "commissions_open"))
         
         if not setting:
             setting = SiteSetting(
@@ -305,22 +408,23 @@ def update_commissions_status(
         else:
             setting.value = str(commissions_open).lower()
         
-        db.commit()
-        db.refresh(setting)
+        await db.commit()
+        await db.refresh(setting)
+        settings_cache.put(setting)
         
         return {
             "commissions_open": commissions_open,
             "message": f"Commissions status updated to {'open' if commissions_open else 'closed'}"
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Error updating commissions status: {str(e)}"
         )
 
 @router.get("/initialize")
-def initialize_default_settings(db: Session = Depends(get_db)):
+async def initialize_default_settings(db: AsyncSession = Depends(get_db)):
     """
     Initialize default site settings if they don't exist.
     """
@@ -351,20 +455,22 @@ def initialize_default_settings(db: Session = Depends(get_db)):
     
     try:
         for setting_data in default_settings:
-            existing = db.query(SiteSetting).filter(SiteSetting.key == setting_data["key"]).first()
+            existing = await db.scalar(select(SiteSetting).where(SiteSetting.key == setting_data["key"]))
             if not existing:
                 new_setting = SiteSetting(**setting_data)
                 db.add(new_setting)
                 created_settings.append(setting_data["key"])
         
-        db.commit()
+        await db.commit()
+        if created_settings:
+            settings_cache.invalidate()
         
         return {
             "message": "Default settings initialized",
             "created_settings": created_settings
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail=f"Error initializing settings: {str(e)}"
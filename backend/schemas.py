@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
+from typing import Optional, List, Dict
+from datetime import datetime, timezone
+import re
 
 # Commission Request Schemas
 class CommissionRequestBase(BaseModel):
@@ -19,6 +20,32 @@ class CommissionRequestUpdate(BaseModel):
     progress_status: Optional[str] = None
     notes: Optional[str] = None
 
+class CommissionBulkFilter(BaseModel):
+    status: Optional[str] = None
+    payment_status: Optional[str] = None
+    progress_status: Optional[str] = None
+
+class CommissionBulkUpdate(BaseModel):
+    # Either explicit ids or a filter selects the commissions to patch
+    ids: Optional[List[str]] = Field(None, min_length=1, max_length=1000)
+    where: Optional[CommissionBulkFilter] = None
+    changes: CommissionRequestUpdate
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        if (self.ids is None) == (self.where is None):
+            raise ValueError("Provide either ids or where")
+        if self.where is not None and not self.where.model_dump(exclude_none=True):
+            raise ValueError("where needs at least one condition")
+        changes = self.changes.model_dump(exclude_unset=True)
+        if not changes:
+            raise ValueError("changes needs at least one field")
+        # Only notes may be cleared; the status columns are never NULL
+        cleared = sorted(field for field, value in changes.items() if value is None and field != "notes")
+        if cleared:
+            raise ValueError(f"changes cannot set {', '.join(cleared)} to null")
+        return self
+
 class CommissionRequestRead(CommissionRequestBase):
     id: str
     status: str
@@ -31,6 +58,63 @@ class CommissionRequestRead(CommissionRequestBase):
     class Config:
         from_attributes = True
 
+class CommissionBulkUpdateResult(BaseModel):
+    updated: int
+    items: List[CommissionRequestRead]
+    # Requested ids that do not exist
+    not_found: List[str] = []
+
+class CommissionSearchResult(CommissionRequestRead):
+    # HTML-escaped fragment with <mark> around the matched terms
+    snippet: Optional[str] = None
+    # bm25 relevance, lower is better
+    rank: float
+
+# Cheap syntactic check: EmailStr (email-validator) costs ~150µs per row,
+# which would dominate a bulk import
+EMAIL_SYNTAX = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+class CommissionImportRow(BaseModel):
+    """One row of POST /commissions/import (same columns as the export)."""
+    id: Optional[str] = None
+    full_name: str
+    discord_id: str
+    email: str
+    project_description: str
+    file_reference: Optional[str] = None
+    status: str = "pending"
+    payment_status: str = "pending"
+    progress_status: str = "in_queue"
+    notes: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @field_validator("email")
+    @classmethod
+    def check_email(cls, value: str) -> str:
+        if not EMAIL_SYNTAX.match(value):
+            raise ValueError("value is not a valid email address")
+        return value
+
+    @field_validator("created_at", "updated_at")
+    @classmethod
+    def as_naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # Stored like CURRENT_TIMESTAMP: naive UTC
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class ImportReport(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
+    # More rows failed than are listed in errors
+    errors_truncated: bool = False
+
 # Portfolio Item Schemas
 class PortfolioItemBase(BaseModel):
     title: str
@@ -47,9 +131,16 @@ class PortfolioItemUpdate(BaseModel):
     category: Optional[str] = None
     is_featured: Optional[bool] = None
 
+class ImageVariant(BaseModel):
+    url: str
+    width: int
+    height: int
+
 class PortfolioItemRead(PortfolioItemBase):
     id: str
     image_url: str
+    # Resized copies by size name (thumb/medium/large), for srcset
+    image_variants: Optional[Dict[str, ImageVariant]] = None
     is_featured: bool
     created_at: datetime
     updated_at: datetime
@@ -57,6 +148,29 @@ class PortfolioItemRead(PortfolioItemBase):
     class Config:
         from_attributes = True
 
+class PortfolioBatchEntry(PortfolioItemBase):
+    # Metadata of one file in a batch upload
+    is_featured: bool = False
+
+class PortfolioBatchItemResult(BaseModel):
+    # Position of the file in the upload
+    index: int
+    filename: Optional[str] = None
+    item: Optional[PortfolioItemRead] = None
+    error: Optional[str] = None
+
+class PortfolioBatchResult(BaseModel):
+    created: int
+    failed: int
+    results: List[PortfolioBatchItemResult]
+
+class PortfolioSearchResult(PortfolioItemRead):
+    # HTML-escaped text with <mark> around the matched terms
+    title_highlight: str
+    snippet: Optional[str] = None
+    # bm25 relevance, lower is better
+    rank: float
+
 # Site Setting Schemas
 class SiteSettingBase(BaseModel):
     key: str
@@ -0,0 +1,91 @@
+"""
+Full-text search helpers (SQLite FTS5).
+
+Search tables are FTS5 indexes over an existing table, kept current by
+triggers (see migrations/0007_portfolio_search.py). Free text from the
+client is never passed to MATCH as is: it is split into words, each quoted
+and used as a prefix, so "drag az" finds "Dragão azul" and FTS5 query
+syntax cannot be injected. Results are ordered by bm25 rank and paginated
+by a (rank, rowid) cursor.
+
+The indexes are keyed by the implicit rowid of the indexed table, which
+VACUUM may renumber; after a VACUUM run ``python migrate.py --rebuild-search``.
+"""
+
+import html
+import re
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import column, func, literal_column, table, tuple_
+from pagination import decode_cursor, encode_cursor
+
+# highlight()/snippet() markers; replaced by <mark> once the text is HTML-escaped
+MARK_START, MARK_END = "\x02", "\x03"
+SNIPPET_ELLIPSIS = "…"
+SNIPPET_TOKENS = 16
+MAX_TERMS = 16
+
+WORD = re.compile(r"\w+")
+
+# FTS5 tables of the search endpoints
+SEARCH_TABLES = ["portfolio_search", "commission_search"]
+
+def search_table(name: str):
+    """Core table for an FTS5 index, with its rowid and rank hidden columns."""
+    return table(name, column("rowid"), column("rank"))
+
+def join_search(query, model, search):
+    """Join the FTS5 index `search` to the rows of `model` it indexes."""
+    return query.join(search, search.c.rowid == literal_column(f"{model.__tablename__}.rowid"))
+
+def match_query(text: str) -> str:
+    """FTS5 MATCH expression for free text: every word must match, as a prefix."""
+    words = WORD.findall(text)[:MAX_TERMS]
+    if not words:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query must contain at least one letter or digit"
+        )
+    return " ".join(f'"{word}"*' for word in words)
+
+def matching(query, search, text: str):
+    """Restrict `query` (already joined to `search`) to the rows matching `text`."""
+    return query.where(literal_column(search.name).op("MATCH")(match_query(text)))
+
+def highlight(search, column_index: int):
+    """The whole value of a column with the matched terms marked."""
+    return func.highlight(literal_column(search.name), column_index, MARK_START, MARK_END)
+
+def snippet(search, column_index: int = -1):
+    """A short fragment around the matches (of the best column when -1)."""
+    return func.snippet(
+        literal_column(search.name), column_index, MARK_START, MARK_END, SNIPPET_ELLIPSIS, SNIPPET_TOKENS
+    )
+
+def marked(text: Optional[str]) -> Optional[str]:
+    """HTML-escape highlight()/snippet() output, turning the markers into <mark> tags."""
+    if text is None:
+        return None
+    return html.escape(text).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+def search_page(query, search, after: Optional[str], limit: int):
+    """Order `query` by relevance and restrict it to the page after `after`."""
+    rank, rowid = search.c.rank, search.c.rowid
+    query = query.add_columns(rank.label("search_rank"), rowid.label("search_rowid"))
+    if after:
+        key = decode_cursor(after)
+        if len(key) != 2 or not all(isinstance(part, (int, float)) for part in key):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid pagination cursor"
+            )
+        query = query.where(tuple_(rank, rowid) > tuple(key))
+    return query.order_by(rank, rowid).limit(limit + 1)
+
+def split_search_page(rows, limit: int) -> Tuple[List, Optional[str]]:
+    """Split rows fetched by search_page into (rows, next_cursor)."""
+    page = rows[:limit]
+    if len(rows) <= limit:
+        return page, None
+    last = rows[limit - 1]
+    return page, encode_cursor(last.search_rank, last.search_rowid)
@@ -0,0 +1,69 @@
+"""
+Incrementally maintained row counters.
+
+SQLite triggers (migrations/0003_stats_counters.py) update ``stats_counters``
+in the same transaction as every write to ``commissions`` and
+``portfolio_items``, so reading the stats is a single small query no matter
+how large those tables grow.
+"""
+
+from typing import Dict
+from sqlalchemy import select
+from models import StatsCounter
+
+COMMISSIONS_TOTAL = "commissions:total"
+COMMISSIONS_STATUS = "commissions:status:"
+COMMISSIONS_PROGRESS = "commissions:progress:"
+PORTFOLIO_TOTAL = "portfolio:total"
+PORTFOLIO_FEATURED = "portfolio:featured"
+PORTFOLIO_CATEGORY = "portfolio:category:"
+
+class Counters:
+    """Snapshot of all counters."""
+
+    def __init__(self, values: Dict[str, int]):
+        self.values = values
+
+    def get(self, name: str) -> int:
+        return self.values.get(name, 0)
+
+    def commission_status(self, status: str) -> int:
+        return self.get(COMMISSIONS_STATUS + status)
+
+    def commission_progress(self, progress_status: str) -> int:
+        return self.get(COMMISSIONS_PROGRESS + progress_status)
+
+    def portfolio_categories(self) -> int:
+        """Number of categories with at least one portfolio item."""
+        return sum(
+            1 for name, value in self.values.items()
+            if name.startswith(PORTFOLIO_CATEGORY) and value > 0
+        )
+
+async def read_counters(db) -> Counters:
+    """Load every counter in one query."""
+    result = await db.execute(select(StatsCounter.name, StatsCounter.value))
+    return Counters(dict(result.all()))
+
+# Every counter from scratch, grouped like the backfill of migration 0003
+RECOUNT = f"""
+INSERT INTO stats_counters (name, value)
+SELECT name, sum(value) FROM (
+    SELECT '{COMMISSIONS_TOTAL}' AS name, count(*) AS value FROM commissions
+    UNION ALL
+    SELECT '{COMMISSIONS_STATUS}' || coalesce(status, ''), count(*) FROM commissions GROUP BY status
+    UNION ALL
+    SELECT '{COMMISSIONS_PROGRESS}' || coalesce(progress_status, ''), count(*) FROM commissions GROUP BY progress_status
+    UNION ALL
+    SELECT '{PORTFOLIO_TOTAL}', count(*) FROM portfolio_items
+    UNION ALL
+    SELECT '{PORTFOLIO_FEATURED}', count(*) FROM portfolio_items WHERE is_featured
+    UNION ALL
+    SELECT '{PORTFOLIO_CATEGORY}' || category, count(*) FROM portfolio_items GROUP BY category
+) GROUP BY name
+"""
+
+def recount(conn) -> None:
+    """Recompute all counters (sync connection), e.g. after a bulk load with the triggers dropped."""
+    conn.exec_driver_sql("DELETE FROM stats_counters")
+    conn.exec_driver_sql(RECOUNT)
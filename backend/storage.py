@@ -0,0 +1,198 @@
+"""
+Streaming, content-addressed upload storage.
+
+Uploads are copied to disk in fixed-size chunks, so memory per upload stays
+at one buffer whatever the file size. The copy goes to a temporary file, is
+aborted as soon as the size limit is crossed, and is hashed while streaming.
+The finished file is then stored under its SHA-256:
+
+    uploads/blobs/ab/cd/abcd...<sha256>.png
+
+so identical uploads share one file and a URL never changes content. The
+`upload_blobs` table counts the rows referencing each blob (triggers on
+portfolio_items.image_url and site_settings.value keep it current); a blob
+file is deleted only after the commit that dropped its last reference.
+
+An upload claims its blob (one extra reference, committed) before the file
+is published, and drops the claim once the row pointing at it is committed
+or rolled back. release_blobs checks the counts and removes files while
+holding SQLite's write lock, so it either finishes before a claim commits
+(and the upload then publishes the file again) or sees the claim.
+"""
+
+import glob
+import hashlib
+import os
+import uuid
+from collections import Counter
+from typing import Dict, Iterable, NamedTuple, Optional
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import bindparam, delete, select, text, update
+from config import settings
+from database import open_session
+from metrics import UPLOAD_BYTES, UPLOADS
+from models import UploadBlob
+
+BLOB_URL_PREFIX = "/" + settings.BLOB_UPLOAD_DIR.strip("/") + "/"
+
+# Same bytes uploaded as .jpeg or .jpg map to the same blob
+EXTENSION_ALIASES = {".jpeg": ".jpg"}
+
+class StoredUpload(NamedTuple):
+    path: str
+    url: str
+    size: int
+    sha256: str
+
+def size_limit_detail(max_size: int) -> str:
+    return f"File size too large. Maximum size is {max_size // (1024 * 1024)}MB"
+
+def is_blob_url(url: Optional[str]) -> bool:
+    return bool(url) and url.startswith(BLOB_URL_PREFIX)
+
+def blob_relative_path(sha256: str, extension: str) -> str:
+    extension = extension.lower()
+    extension = EXTENSION_ALIASES.get(extension, extension)
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}"
+
+async def save_upload(upload: UploadFile, extension: str, max_size: int) -> StoredUpload:
+    """
+    Stream `upload` into the blob store, raising 400 once it exceeds `max_size` bytes.
+
+    The blob is claimed before it is published: once the row pointing at
+    `url` is committed, or rolled back, call release_blobs(db, [], claims=[url]).
+    """
+    import aiofiles  # on first upload rather than at startup
+
+    directory = settings.BLOB_UPLOAD_DIR
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{uuid.uuid4()}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as out_file:
+            while True:
+                chunk = await upload.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=size_limit_detail(max_size)
+                    )
+                digest.update(chunk)
+                await out_file.write(chunk)
+        relative_path = blob_relative_path(digest.hexdigest(), extension)
+        final_path = os.path.join(directory, relative_path)
+        url = BLOB_URL_PREFIX + relative_path
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        await claim_blob(url)
+        try:
+            # Replacing an existing blob swaps in identical bytes, and guarantees the
+            # file is present even if a release removed it just before the claim
+            os.replace(temp_path, final_path)
+        except BaseException:
+            async with open_session() as db:
+                await release_blobs(db, [], claims=[url])
+            raise
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    UPLOADS.inc()
+    UPLOAD_BYTES.inc(amount=size)
+    return StoredUpload(final_path, url, size, digest.hexdigest())
+
+def _remove_blob_files(url: str) -> None:
+    file_path = url.lstrip("/")
+    # The blob and its derivatives (<sha256>-<size>.webp, see images.py)
+    for path in [file_path, *glob.glob(f"{glob.escape(os.path.splitext(file_path)[0])}-*")]:
+        if os.path.exists(path):
+            os.remove(path)
+    # Prune the now possibly empty shard directories (ab/cd/)
+    shard = os.path.dirname(file_path)
+    for directory in (shard, os.path.dirname(shard)):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+
+async def claim_blob(url: str) -> None:
+    """Commit one reference to `url` for an upload in progress (see save_upload)."""
+    async with open_session() as db:
+        await db.execute(text(
+            "INSERT INTO upload_blobs (url, ref_count) VALUES (:url, 1) "
+            "ON CONFLICT(url) DO UPDATE SET ref_count = ref_count + 1"
+        ), {"url": url})
+        await db.commit()
+
+async def release_blobs(db, urls: Iterable[Optional[str]], claims: Iterable[str] = ()) -> None:
+    """
+    Drop the save_upload `claims`, then delete the files of blobs in `urls`
+    and `claims` that are no longer referenced.
+
+    Call after the commit (or rollback) that dropped the references; URLs
+    outside the blob store are ignored. Runs (and commits) its own transaction.
+    """
+    claims = Counter(url for url in claims if is_blob_url(url))
+    candidates = {url for url in urls if is_blob_url(url)} | set(claims)
+    if not candidates:
+        return
+    blobs = UploadBlob.__table__
+    if claims:
+        await db.execute(
+            update(blobs)
+            .where(blobs.c.url == bindparam("blob_url"))
+            .values(ref_count=blobs.c.ref_count - bindparam("claims")),
+            [{"blob_url": url, "claims": count} for url, count in claims.items()]
+        )
+    # The first write takes the write lock, held until the commit: no claim
+    # can land between reading the counts and removing the files
+    await db.execute(delete(blobs).where(blobs.c.url.in_(candidates), blobs.c.ref_count <= 0))
+    referenced = set(await db.scalars(select(blobs.c.url).where(blobs.c.url.in_(candidates))))
+    try:
+        for url in candidates - referenced:
+            _remove_blob_files(url)
+    finally:
+        await db.commit()
+
+def recount_blobs(conn) -> None:
+    """Recompute upload_blobs from the referencing rows (sync connection), like migration 0006."""
+    conn.execute(text("DELETE FROM upload_blobs"))
+    conn.execute(text(
+        "INSERT INTO upload_blobs (url, ref_count) "
+        "SELECT url, count(*) FROM ("
+        "SELECT image_url AS url FROM portfolio_items WHERE image_url LIKE :prefix "
+        "UNION ALL SELECT value AS url FROM site_settings WHERE value LIKE :prefix"
+        ") GROUP BY url"
+    ), {"prefix": BLOB_URL_PREFIX + "%"})
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversized uploads from their Content-Length, before the body is read.
+
+    `limits` maps upload paths to their file size limit; the request may exceed
+    it by `slack` bytes to allow for the multipart envelope and form fields.
+    """
+
+    def __init__(self, app, limits: Dict[str, int], slack: int = 64 * 1024):
+        self.app = app
+        self.limits = {path.rstrip("/"): limit for path, limit in limits.items()}
+        self.slack = slack
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limit = self.limits.get(scope["path"].rstrip("/"))
+            if limit is not None:
+                headers = dict(scope["headers"])
+                content_length = headers.get(b"content-length")
+                if content_length and content_length.isdigit() and int(content_length) > limit + self.slack:
+                    response = JSONResponse(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        content={"detail": size_limit_detail(limit)}
+                    )
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
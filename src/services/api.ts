@@ -17,17 +17,38 @@ export interface CommissionRequest {
   updated_at: string;
 }
 
+export interface CommissionSearchResult extends CommissionRequest {
+  // Trecho já escapado, com <mark> em volta dos termos encontrados
+  snippet?: string | null;
+  rank: number;
+}
+
 export interface PortfolioItem {
   id: string;
   title: string;
   description?: string;
   category: string;
   image_url: string;
+  // Cópias redimensionadas (thumb/medium/large) para usar em srcset
+  image_variants?: Record<string, { url: string; width: number; height: number }> | null;
   is_featured: boolean;
   created_at: string;
   updated_at: string;
 }
 
+export interface PortfolioSearchResult extends PortfolioItem {
+  // Texto já escapado, com <mark> em volta dos termos encontrados
+  title_highlight: string;
+  snippet?: string | null;
+  rank: number;
+}
+
+export interface SearchPage<T> {
+  items: T[];
+  // Enviar como `after` para buscar a próxima página (null na última)
+  nextCursor: string | null;
+}
+
 export interface SiteSetting {
   id: number;
   key: string;
@@ -149,6 +170,66 @@ class ApiService {
     return response.json();
   }
 
+  async searchCommissions(q: string, options: {
+    status_filter?: CommissionRequest['status'];
+    progress_filter?: CommissionRequest['progress_status'];
+    limit?: number;
+    after?: string;
+  } = {}): Promise<SearchPage<CommissionSearchResult>> {
+    const params = new URLSearchParams({ q });
+    if (options.status_filter) params.append('status_filter', options.status_filter);
+    if (options.progress_filter) params.append('progress_filter', options.progress_filter);
+    if (options.limit) params.append('limit', String(options.limit));
+    if (options.after) params.append('after', options.after);
+
+    const response = await fetch(`${API_BASE_URL}/commissions/search?${params}`, {
+      headers: this.getHeaders(),
+    });
+
+    if (!response.ok) {
+      throw new Error('Falha ao buscar comissões');
+    }
+
+    return {
+      items: await response.json(),
+      nextCursor: response.headers.get('X-Next-Cursor'),
+    };
+  }
+
+  async exportCommissions(format: 'csv' | 'ndjson' = 'csv'): Promise<Blob> {
+    const response = await fetch(`${API_BASE_URL}/commissions/export?format=${format}`, {
+      headers: this.getHeaders(),
+    });
+
+    if (!response.ok) {
+      throw new Error('Falha ao exportar comissões');
+    }
+
+    return response.blob();
+  }
+
+  async importCommissions(file: File): Promise<{
+    imported: number;
+    failed: number;
+    errors: { line: number; error: string }[];
+    errors_truncated: boolean;
+  }> {
+    const formData = new FormData();
+    formData.append('file', file);
+
+    const response = await fetch(`${API_BASE_URL}/commissions/import`, {
+      method: 'POST',
+      headers: this.getFormHeaders(),
+      body: formData,
+    });
+
+    if (!response.ok) {
+      throw new Error('Falha ao importar comissões');
+    }
+
+    return response.json();
+  }
+
   async createCommission(data: {
     full_name: string;
     discord_id: string;
@@ -188,6 +269,28 @@ class ApiService {
     return response.json();
   }
 
+  async bulkUpdateCommissions(
+    selection: { ids: string[] } | { where: { status?: string; payment_status?: string; progress_status?: string } },
+    changes: {
+      status?: string;
+      payment_status?: string;
+      progress_status?: string;
+      notes?: string;
+    }
+  ): Promise<{ updated: number; items: CommissionRequest[]; not_found: string[] }> {
+    const response = await fetch(`${API_BASE_URL}/commissions/bulk-update`, {
+      method: 'POST',
+      headers: this.getHeaders(),
+      body: JSON.stringify({ ...selection, changes }),
+    });
+
+    if (!response.ok) {
+      throw new Error('Falha ao atualizar comissões');
+    }
+
+    return response.json();
+  }
+
   async deleteCommission(id: string): Promise<void> {
     const response = await fetch(`${API_BASE_URL}/commissions/${id}`, {
       method: 'DELETE',
@@ -237,6 +340,34 @@ class ApiService {
     return response.json();
   }
 
+  async createPortfolioItems(items: {
+    title: string;
+    description?: string;
+    category: string;
+    is_featured?: boolean;
+    image: File;
+  }[]): Promise<{
+    created: number;
+    failed: number;
+    results: { index: number; filename?: string; item?: PortfolioItem; error?: string }[];
+  }> {
+    const formData = new FormData();
+    formData.append('metadata', JSON.stringify(items.map(({ image, ...metadata }) => metadata)));
+    items.forEach((item) => formData.append('images', item.image));
+
+    const response = await fetch(`${API_BASE_URL}/portfolio/batch`, {
+      method: 'POST',
+      headers: this.getFormHeaders(),
+      body: formData,
+    });
+
+    if (!response.ok) {
+      throw new Error('Falha ao criar itens do portfólio');
+    }
+
+    return response.json();
+  }
+
   async updatePortfolioItem(id: string, data: {
     title?: string;
     description?: string;
@@ -267,6 +398,30 @@ class ApiService {
     }
   }
 
+  async searchPortfolio(q: string, options: {
+    category?: string;
+    featured_only?: boolean;
+    limit?: number;
+    after?: string;
+  } = {}): Promise<SearchPage<PortfolioSearchResult>> {
+    const params = new URLSearchParams({ q });
+    if (options.category) params.append('category', options.category);
+    if (options.featured_only) params.append('featured_only', 'true');
+    if (options.limit) params.append('limit', String(options.limit));
+    if (options.after) params.append('after', options.after);
+
+    const response = await fetch(`${API_BASE_URL}/portfolio/search?${params}`);
+
+    if (!response.ok) {
+      throw new Error('Falha ao buscar no portfólio');
+    }
+
+    return {
+      items: await response.json(),
+      nextCursor: response.headers.get('X-Next-Cursor'),
+    };
+  }
+
   async getPortfolioCategories(): Promise<{ categories: string[] }> {
     const response = await fetch(`${API_BASE_URL}/portfolio/categories/list`);
 